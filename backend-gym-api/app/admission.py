@@ -0,0 +1,67 @@
+# backend/admission.py
+# Bounded concurrency for CPU-heavy endpoints. Requests beyond the concurrency
+# limit wait in a capped queue; once the queue is full they are turned away
+# immediately with 503 + Retry-After instead of piling up behind the worker timeout.
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, status
+
+from . import metrics
+
+
+class AdmissionLimiter:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, retry_after: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._active = 0
+        self._waiting = 0
+
+    def _update_gauges(self):
+        metrics.set_gauge(f"{self.name}.active", self._active)
+        metrics.set_gauge(f"{self.name}.queue_depth", self._waiting)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            metrics.inc(f"{self.name}.rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Face recognition is busy. Please retry shortly.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        self._waiting += 1
+        self._update_gauges()
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+            self._update_gauges()
+        metrics.observe(f"{self.name}.queue_wait", time.perf_counter() - queued_at)
+
+        self._active += 1
+        self._update_gauges()
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+            self._update_gauges()
+            metrics.observe(f"{self.name}.service_time", time.perf_counter() - started_at)
+
+
+face_pipeline = AdmissionLimiter(
+    "face_pipeline",
+    max_concurrent=int(os.getenv("FACE_MAX_CONCURRENCY", 2)),
+    max_queue=int(os.getenv("FACE_MAX_QUEUE", 8)),
+    retry_after=int(os.getenv("FACE_RETRY_AFTER_SECONDS", 5)),
+)
+
@@ -0,0 +1,81 @@
+# backend/attendance.py
+# Set-based writes to user_attendance, keyed on the unique (user_id, date) constraint.
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+ATTENDANCE_COLUMNS = ("user_id", "date", "time", "status", "branch")
+
+
+def existing_attendance_keys(db: Session, keys: Iterable[Tuple[int, object]]) -> Set[Tuple[int, object]]:
+    """(user_id, date) pairs from keys that already have a row, in one tuple IN query."""
+    keys = list(set(keys))
+    if not keys:
+        return set()
+    attendance = models.UserAttendance
+    return {
+        (row.user_id, row.date)
+        for row in db.execute(
+            select(attendance.user_id, attendance.date).where(
+                tuple_(attendance.user_id, attendance.date).in_(keys)
+            )
+        )
+    }
+
+
+def upsert_attendance(db: Session, rows: Iterable[Dict], update_existing: bool = True) -> Set[Tuple[int, object]]:
+    """
+    Writes attendance rows (dicts with user_id, date, status and optionally time and
+    branch) in one statement. An existing row for the same (user_id, date) gets the
+    new status, and the new time when one is given; with update_existing=False it
+    is left alone. Later rows win over earlier ones for the same key.
+
+    Returns the (user_id, date) keys that were inserted or updated. Does not commit.
+    """
+    deduped: Dict[Tuple[int, object], Dict] = {}
+    for row in rows:
+        deduped[(row["user_id"], row["date"])] = {column: row.get(column) for column in ATTENDANCE_COLUMNS}
+    if not deduped:
+        return set()
+    values: List[Dict] = list(deduped.values())
+
+    table = models.UserAttendance.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table)
+        if update_existing:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "date"],
+                set_={
+                    "status": stmt.excluded.status,
+                    "time": func.coalesce(stmt.excluded.time, table.c.time),
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "date"])
+        stmt = stmt.returning(table.c.user_id, table.c.date)
+        return {(r.user_id, r.date) for r in db.execute(stmt, values)}
+
+    # Other dialects: look up existing rows once, then bulk insert and update
+    existing = existing_attendance_keys(db, deduped.keys())
+    new_rows = [v for key, v in deduped.items() if key not in existing]
+    if new_rows:
+        db.execute(insert(table), new_rows)
+    written = {(v["user_id"], v["date"]) for v in new_rows}
+    if update_existing:
+        for key in existing:
+            row = deduped[key]
+            changes = {"status": row["status"]}
+            if row["time"] is not None:
+                changes["time"] = row["time"]
+            db.execute(
+                update(table).where(table.c.user_id == key[0], table.c.date == key[1]).values(**changes)
+            )
+            written.add(key)
+    return written
@@ -1,14 +1,58 @@
 # backend/crud.py
 from sqlalchemy.orm import Session
-from . import models, schemas
-from passlib.hash import bcrypt
+from sqlalchemy import case, func, select, union_all, literal, update
+from . import models, schemas, passwords
 from typing import Optional, List, Dict, Any # Import for type hinting
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
+def identity_lookup(email: str):
+    """
+    One round trip that resolves an email to a user and/or a trainer, users first.
+    Emails match case-insensitively; both branches of the UNION ALL hit the
+    lower(email) index of their table, and an exact-case match sorts first.
+    Rows expose kind, id, name, email, phone, role, branch, password and is_verified.
+    """
+    email_key = email.lower()
+    users = select(
+        literal(0).label("priority"),
+        literal("user").label("kind"),
+        models.User.id,
+        models.User.name,
+        models.User.email,
+        models.User.phone,
+        models.User.role,
+        models.User.branch,
+        models.User.password,
+        models.User.is_verified,
+    ).where(func.lower(models.User.email) == email_key)
+
+    trainers = select(
+        literal(1).label("priority"),
+        literal("trainer").label("kind"),
+        models.Trainer.id,
+        models.Trainer.name,
+        models.Trainer.email,
+        models.Trainer.phone,
+        literal("trainer").label("role"),
+        models.Trainer.branch_name.label("branch"),
+        models.Trainer.password,
+        literal(True).label("is_verified"),
+    ).where(func.lower(models.Trainer.email) == email_key)
+
+    identities = union_all(users, trainers).subquery()
+    return select(identities).order_by(
+        identities.c.priority, case((identities.c.email == email, 0), else_=1)
+    )
+
+def password_update(kind: str, identity_id: int, hashed_password: str):
+    """UPDATE statement replacing the password hash of an identity_lookup row."""
+    model = models.Trainer if kind == "trainer" else models.User
+    return update(model).where(model.id == identity_id).values(password=hashed_password)
+
 def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = bcrypt.hash(user.password)
+    hashed_password = passwords.hash_password(user.password)
     db_user = models.User(
         name=user.name,
         email=user.email,
@@ -1,17 +1,127 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from dotenv import load_dotenv
 import os
+import time
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, declarative_base
+
+from . import metrics
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Pool tuning, per worker process. Keep pool_size + max_overflow times the number of
+# gunicorn workers below the Postgres max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "smartflex-api")
+
+
+def _set_statement_timeout(dbapi_connection, connection_record):
+    """
+    Applies DB_STATEMENT_TIMEOUT_MS with a SET once connected, rather than as an
+    "options" startup parameter: that would replace options given in DATABASE_URL,
+    and poolers such as pgbouncer and Neon's pooled endpoint reject it.
+    """
+    if not DB_STATEMENT_TIMEOUT_MS:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SET statement_timeout = {int(DB_STATEMENT_TIMEOUT_MS)}")
+    finally:
+        cursor.close()
+    dbapi_connection.commit()
+
+
+def create_db_engine(url: str = DATABASE_URL):
+    """
+    Creates the engine with pooling tuned for gunicorn workers. Connections are
+    pre-pinged and recycled so a Postgres restart does not leave dead connections
+    in the pool, and each connection is tagged with the worker pid.
+    """
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+    @event.listens_for(engine, "do_connect")
+    def _set_connection_options(dialect, conn_rec, cargs, cparams):
+        # Resolved per connection, so forked workers report their own pid
+        cparams["application_name"] = f"{DB_APPLICATION_NAME}-{os.getpid()}"
+
+    event.listen(engine, "connect", _set_statement_timeout)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.inc("db.pool.checkouts")
+        metrics.set_gauge("db.pool.checked_out", engine.pool.checkedout())
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.set_gauge("db.pool.checked_out", engine.pool.checkedout())
+
+    return engine
+
+
 # Create engine and session
-engine = create_engine(DATABASE_URL)
+engine = create_db_engine()
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+
+POOL_BUSY_DETAIL = "The server is busy. Please retry shortly."
+
+
+def checkout_connection(db):
+    """
+    Acquires the session's connection now, so an exhausted pool fails with a 503
+    here. For short lookups that are about to query anyway.
+    """
+    started = time.perf_counter()
+    try:
+        db.connection()
+    except PoolTimeoutError:
+        metrics.inc("db.pool.timeouts")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=POOL_BUSY_DETAIL,
+            headers={"Retry-After": "2"},
+        )
+    finally:
+        metrics.observe("db.pool.checkout_wait", time.perf_counter() - started)
+
+
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    """
+    App exception handler: a pool timeout on a session's first query becomes a 503.
+    Request sessions check out their connection lazily, so requests that spend most
+    of their time elsewhere (face detection, uploads) do not hold one meanwhile.
+    """
+    metrics.inc("db.pool.timeouts")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": POOL_BUSY_DETAIL},
+        headers={"Retry-After": "2"},
+    )
+
+
 # ✅ ADD THIS FUNCTION
 def get_db():
     db = SessionLocal()
@@ -19,3 +129,81 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# --- Async engine (asyncpg in production, aiosqlite for local SQLite/tests) ---
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """Maps the sync DATABASE_URL onto the matching async driver."""
+    sa_url = make_url(url)
+    backend = sa_url.get_backend_name()
+    if backend == "postgresql":
+        sa_url = sa_url.set(drivername="postgresql+asyncpg")
+        # asyncpg spells libpq's sslmode as ssl
+        if "sslmode" in sa_url.query:
+            sslmode = sa_url.query["sslmode"]
+            sa_url = sa_url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    elif backend == "sqlite":
+        sa_url = sa_url.set(drivername="sqlite+aiosqlite")
+    return sa_url.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url()
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """Creates the async engine on first use, so workers that never serve async endpoints skip it."""
+    global _async_engine
+    if _async_engine is None:
+        if ASYNC_DATABASE_URL.startswith("sqlite"):
+            _async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        else:
+            _async_engine = create_async_engine(
+                ASYNC_DATABASE_URL,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING,
+            )
+
+            @event.listens_for(_async_engine.sync_engine, "do_connect")
+            def _set_connection_options(dialect, conn_rec, cargs, cparams):
+                server_settings = cparams.setdefault("server_settings", {})
+                server_settings["application_name"] = f"{DB_APPLICATION_NAME}-{os.getpid()}"
+
+            event.listen(_async_engine.sync_engine, "connect", _set_statement_timeout)
+    return _async_engine
+
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def checkout_async_connection(db):
+    """Async counterpart of checkout_connection."""
+    started = time.perf_counter()
+    try:
+        await db.connection()
+    except PoolTimeoutError:
+        metrics.inc("db.async_pool.timeouts")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=POOL_BUSY_DETAIL,
+            headers={"Retry-After": "2"},
+        )
+    finally:
+        metrics.observe("db.async_pool.checkout_wait", time.perf_counter() - started)
+
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
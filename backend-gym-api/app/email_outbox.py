@@ -0,0 +1,342 @@
+# backend/email_outbox.py
+# Durable outbound email queue. Handlers call enqueue_email() inside their own
+# transaction; a background thread per worker claims due messages in batches and
+# delivers them over one persistent SMTP session, retrying with exponential backoff.
+# Claiming is a short transaction that leases the rows; no row locks or pooled
+# connections are held while talking to the SMTP server.
+import os
+import smtplib
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import database, email_templates, metrics, models
+
+load_dotenv()
+
+EMAIL_OUTBOX_ENABLED = os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 5))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 20))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 8))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+# Servers drop idle sessions; close ours first rather than finding out on the next send
+EMAIL_SMTP_IDLE_SECONDS = float(os.getenv("EMAIL_SMTP_IDLE_SECONDS", 60))
+# Set to false for a plain local SMTP stand-in such as `python -m aiosmtpd -n`
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
+# Claimed messages are leased for this long; a sender that dies mid-batch leaves them
+# to be picked up again once the lease runs out
+EMAIL_CLAIM_LEASE_SECONDS = float(os.getenv("EMAIL_CLAIM_LEASE_SECONDS", 300))
+# Sent messages are deleted after this many days (0 keeps them forever)
+EMAIL_OUTBOX_RETENTION_DAYS = float(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", 7))
+EMAIL_OUTBOX_PRUNE_INTERVAL_SECONDS = float(os.getenv("EMAIL_OUTBOX_PRUNE_INTERVAL_SECONDS", 3600))
+
+_PENDING_FLAG = "email_outbox_pending"
+
+# Errors that mean the SMTP session is unusable, as opposed to one message being refused
+_CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    ConnectionError,
+    TimeoutError,
+    socket.gaierror,
+)
+
+
+class SMTPUnavailable(Exception):
+    """The SMTP session could not be opened or was lost; no message is to blame."""
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, html_content: str) -> models.EmailOutbox:
+    """
+    Queues an email in the caller's transaction. Nothing is sent until the caller
+    commits, and a rolled back request never sends its email.
+    """
+    message = models.EmailOutbox(to_email=to_email, subject=subject, html_content=html_content)
+    db.add(message)
+    db.info[_PENDING_FLAG] = True
+    return message
+
+
+def enqueue_template(db: Session, template_name: str, messages: Iterable[Tuple[str, str, dict]]) -> int:
+    """
+    Renders one template for many recipients and queues the results with one bulk
+    INSERT. messages are (to_email, subject, context) tuples. Returns how many were queued.
+    """
+    messages = list(messages)
+    if not messages:
+        return 0
+    bodies = email_templates.render_many(template_name, [context for _, _, context in messages])
+    db.execute(insert(models.EmailOutbox), [
+        {"to_email": to_email, "subject": subject, "html_content": html_content}
+        for (to_email, subject, _), html_content in zip(messages, bodies)
+    ])
+    db.info[_PENDING_FLAG] = True
+    return len(messages)
+
+
+@event.listens_for(database.SessionLocal, "after_commit")
+def _wake_sender_after_commit(session):
+    if session.info.pop(_PENDING_FLAG, False):
+        sender.wake()
+
+
+@event.listens_for(database.SessionLocal, "after_rollback")
+def _clear_pending_after_rollback(session):
+    session.info.pop(_PENDING_FLAG, None)
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(EMAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), EMAIL_RETRY_MAX_SECONDS)
+
+
+class SMTPSession:
+    """One reusable SMTP connection: connects lazily, checks liveness with NOOP, closes when idle."""
+
+    def __init__(self):
+        self.host = os.getenv("EMAIL_HOST")
+        self.port = int(os.getenv("EMAIL_PORT", 587))
+        self.user = os.getenv("EMAIL_USER")
+        self.password = os.getenv("EMAIL_PASS")
+        self.from_name = os.getenv("EMAIL_FROM_NAME")
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    @property
+    def configured(self) -> bool:
+        return all([self.host, self.port, self.user, self.from_name])
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        if EMAIL_USE_TLS:
+            server.starttls()
+        if self.password:
+            server.login(self.user, self.password)
+        metrics.inc("email.smtp_connects")
+        return server
+
+    def _alive(self) -> bool:
+        try:
+            return self._server.noop()[0] == 250
+        except OSError:
+            return False
+
+    def open(self):
+        """Connects and logs in unless a live session exists. Any failure raises SMTPUnavailable."""
+        if self._server is not None and not self._alive():
+            self.close()
+        if self._server is None:
+            try:
+                self._server = self._connect()
+            except Exception as e:
+                raise SMTPUnavailable(str(e)) from e
+
+    def send(self, to_email: str, subject: str, html_content: str):
+        self.open()
+
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = f"{self.from_name} <{self.user}>"
+        message["To"] = to_email
+        message.attach(MIMEText(html_content, "html"))
+
+        try:
+            self._server.sendmail(self.user, to_email, message.as_string())
+        except _CONNECTION_ERRORS as e:
+            self.close()
+            raise SMTPUnavailable(str(e)) from e
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > EMAIL_SMTP_IDLE_SECONDS:
+            self.close()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+
+class OutboxSender:
+    def __init__(self):
+        self.smtp = SMTPSession()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+    def start(self):
+        if not EMAIL_OUTBOX_ENABLED:
+            print("Email outbox sender disabled (EMAIL_OUTBOX_ENABLED=false).")
+            return
+        if not self.smtp.configured:
+            print("Email configuration is missing. Emails stay queued in the outbox.")
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.smtp.close()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.process_batch()
+            except Exception as e:
+                print(f"Email outbox error: {e}")
+                processed = 0
+            # A full batch means more may be due; otherwise sleep until woken or the next poll
+            if processed < EMAIL_OUTBOX_BATCH_SIZE:
+                self.smtp.close_if_idle()
+                if time.monotonic() - self._last_prune > EMAIL_OUTBOX_PRUNE_INTERVAL_SECONDS:
+                    self._last_prune = time.monotonic()
+                    try:
+                        self.prune_sent()
+                    except Exception as e:
+                        print(f"Email outbox prune error: {e}")
+                self._wake.wait(EMAIL_OUTBOX_POLL_SECONDS)
+                self._wake.clear()
+
+    def claim_batch(self) -> list:
+        """
+        Leases up to EMAIL_OUTBOX_BATCH_SIZE due messages by pushing their next_attempt_at
+        past the lease, in one short transaction. Returns rows of id, to_email, subject,
+        html_content and attempts.
+        """
+        db = database.SessionLocal()
+        try:
+            # SKIP LOCKED lets every worker run a sender without two of them claiming the same row
+            messages = db.execute(
+                select(
+                    models.EmailOutbox.id,
+                    models.EmailOutbox.to_email,
+                    models.EmailOutbox.subject,
+                    models.EmailOutbox.html_content,
+                    models.EmailOutbox.attempts,
+                ).where(
+                    models.EmailOutbox.status == "pending",
+                    models.EmailOutbox.next_attempt_at <= datetime.utcnow(),
+                ).order_by(models.EmailOutbox.id).limit(EMAIL_OUTBOX_BATCH_SIZE).with_for_update(skip_locked=True)
+            ).all()
+            if messages:
+                db.execute(
+                    update(models.EmailOutbox)
+                    .where(models.EmailOutbox.id.in_([m.id for m in messages]))
+                    .values(next_attempt_at=datetime.utcnow() + timedelta(seconds=EMAIL_CLAIM_LEASE_SECONDS))
+                )
+            db.commit()
+            return messages
+        finally:
+            db.close()
+
+    def process_batch(self) -> int:
+        """
+        Claims and delivers one batch of due messages. Returns how many were claimed,
+        or 0 when the SMTP server is unreachable so the loop backs off until the next poll.
+        """
+        messages = self.claim_batch()
+        if not messages:
+            return 0
+
+        results = {}  # id -> (status, error)
+        smtp_error = None
+        for message in messages:
+            started = time.perf_counter()
+            try:
+                self.smtp.send(message.to_email, message.subject, message.html_content)
+            except SMTPUnavailable as e:
+                # Not the message's fault: the rest of the batch is retried later without using an attempt
+                smtp_error = e
+                break
+            except smtplib.SMTPRecipientsRefused as e:
+                # Retrying will not help a rejected address
+                results[message.id] = ("refused", e)
+            except Exception as e:
+                results[message.id] = ("error", e)
+            else:
+                results[message.id] = ("sent", None)
+                metrics.inc("email.sent")
+            finally:
+                metrics.observe("email.send_time", time.perf_counter() - started)
+
+        if smtp_error is not None:
+            metrics.inc("email.smtp_unavailable")
+            print(f"SMTP server unavailable, {len(messages) - len(results)} email(s) stay queued: {smtp_error}")
+
+        self._record_results(messages, results)
+        return 0 if smtp_error is not None else len(messages)
+
+    def _record_results(self, messages: list, results: dict):
+        db = database.SessionLocal()
+        try:
+            now = datetime.utcnow()
+            for message in messages:
+                outcome = results.get(message.id)
+                if outcome is None:
+                    # Never attempted: release the lease so the next poll picks it up
+                    values = {"next_attempt_at": now}
+                elif outcome[0] == "sent":
+                    values = {"status": "sent", "sent_at": now, "attempts": message.attempts + 1, "last_error": None}
+                else:
+                    values = self._failure_values(message, outcome[1], permanent=outcome[0] == "refused")
+                db.execute(update(models.EmailOutbox).where(models.EmailOutbox.id == message.id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def _failure_values(self, message, error: Exception, permanent: bool = False) -> dict:
+        attempts = message.attempts + 1
+        values = {"attempts": attempts, "last_error": str(error)[:500]}
+        if permanent or attempts >= EMAIL_MAX_ATTEMPTS:
+            values["status"] = "failed"
+            metrics.inc("email.failed")
+            print(f"Giving up on email {message.id} to {message.to_email}: {error}")
+        else:
+            values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=_retry_delay(attempts))
+            metrics.inc("email.retried")
+            print(f"Error sending email {message.id} to {message.to_email}, will retry: {error}")
+        return values
+
+    def prune_sent(self) -> int:
+        """Deletes sent messages older than EMAIL_OUTBOX_RETENTION_DAYS. Returns how many went."""
+        if EMAIL_OUTBOX_RETENTION_DAYS <= 0:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(days=EMAIL_OUTBOX_RETENTION_DAYS)
+        db = database.SessionLocal()
+        try:
+            deleted = db.execute(
+                delete(models.EmailOutbox).where(
+                    models.EmailOutbox.status == "sent",
+                    models.EmailOutbox.sent_at < cutoff,
+                )
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        metrics.inc("email.pruned", deleted)
+        return deleted
+
+
+sender = OutboxSender()
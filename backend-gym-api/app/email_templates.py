@@ -0,0 +1,55 @@
+# backend/email_templates.py
+# Email bodies rendered from Jinja2 templates in app/templates. Templates are
+# compiled once (at startup via load_templates, or on first use) and shared by
+# every render, so bulk sends only pay for rendering.
+import os
+import threading
+from typing import Dict, Iterable, List
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template, select_autoescape
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+# Registered templates; load_templates() compiles all of them
+RECEIPT = "receipt.html"
+VERIFICATION = "verification.html"
+FEE_REMINDER = "fee_reminder.html"
+TEMPLATE_NAMES = (RECEIPT, VERIFICATION, FEE_REMINDER)
+
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    undefined=StrictUndefined,
+    # Templates are deployed with the code, so skip the per-render mtime check
+    auto_reload=False,
+)
+
+_compiled: Dict[str, Template] = {}
+_lock = threading.Lock()
+
+
+def load_templates():
+    """Compiles every registered template so the first request does not pay for it."""
+    for name in TEMPLATE_NAMES:
+        get_template(name)
+
+
+def get_template(name: str) -> Template:
+    template = _compiled.get(name)
+    if template is None:
+        with _lock:
+            template = _compiled.get(name)
+            if template is None:
+                template = environment.get_template(name)
+                _compiled[name] = template
+    return template
+
+
+def render(template_name: str, **context) -> str:
+    return get_template(template_name).render(**context)
+
+
+def render_many(template_name: str, contexts: Iterable[dict]) -> List[str]:
+    """Renders one template for many recipients, looking the template up once."""
+    template = get_template(template_name)
+    return [template.render(**context) for context in contexts]
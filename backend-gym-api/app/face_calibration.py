@@ -0,0 +1,246 @@
+# backend/face_calibration.py
+"""
+Offline evaluation of the face match threshold.
+
+Computes genuine (same person) and impostor (different people) distance
+distributions, prints FAR/FRR at each candidate threshold and recommends a
+threshold per branch.
+
+    # Enrolled encodings from the database (one template per user: impostor pairs only)
+    python -m app.face_calibration --source db
+
+    # Labelled images laid out as <dir>/<branch>/<person>/<image>
+    python -m app.face_calibration --source images --images-dir ./faces
+
+    # Pre-computed encodings: .npz with 'encodings' (N x 128), 'labels' and optional 'branches'
+    python -m app.face_calibration --source npz --npz encodings.npz
+
+Use --write-tolerances to produce the JSON file read through FACE_TOLERANCE_FILE. It
+refuses (exit status 2) when a group has no genuine pairs, as with --source db, or
+when no threshold meets --target-far.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Distances are histogrammed rather than stored, so memory stays flat for large galleries
+BIN_WIDTH = 0.005
+MAX_DISTANCE = 1.5
+BLOCK_SIZE = 512
+
+
+def load_from_db() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    from . import database, models
+
+    db = database.SessionLocal()
+    try:
+        rows = db.query(models.User.id, models.User.branch, models.User.face_encoding).filter(
+            models.User.face_encoding.isnot(None)
+        ).all()
+    finally:
+        db.close()
+
+    encodings = np.vstack([np.frombuffer(r.face_encoding, dtype=np.float64) for r in rows]) if rows else np.empty((0, 128))
+    labels = np.array([r.id for r in rows])
+    branches = np.array([r.branch or "" for r in rows])
+    return encodings, labels, branches
+
+
+def load_from_images(images_dir: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    import face_recognition
+
+    encodings, labels, branches = [], [], []
+    for branch in sorted(os.listdir(images_dir)):
+        branch_dir = os.path.join(images_dir, branch)
+        if not os.path.isdir(branch_dir):
+            continue
+        for person in sorted(os.listdir(branch_dir)):
+            person_dir = os.path.join(branch_dir, person)
+            if not os.path.isdir(person_dir):
+                continue
+            for image_name in sorted(os.listdir(person_dir)):
+                image = face_recognition.load_image_file(os.path.join(person_dir, image_name))
+                found = face_recognition.face_encodings(image)
+                if len(found) != 1:
+                    print(f"Skipping {branch}/{person}/{image_name}: {len(found)} faces found", file=sys.stderr)
+                    continue
+                encodings.append(found[0])
+                labels.append(f"{branch}/{person}")
+                branches.append(branch)
+
+    return (np.vstack(encodings) if encodings else np.empty((0, 128))), np.array(labels), np.array(branches)
+
+
+def load_from_npz(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    data = np.load(path, allow_pickle=False)
+    encodings = np.asarray(data["encodings"], dtype=np.float64)
+    labels = np.asarray(data["labels"])
+    branches = np.asarray(data["branches"]) if "branches" in data else np.full(len(labels), "")
+    return encodings, labels, branches
+
+
+def distance_histograms(encodings: np.ndarray, labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Histograms of genuine and impostor pair distances over every unordered pair.
+    Works block by block with ||a||^2 + ||b||^2 - 2ab so only BLOCK_SIZE x N
+    distances are in memory at once.
+    """
+    n_bins = int(round(MAX_DISTANCE / BIN_WIDTH))
+    genuine = np.zeros(n_bins, dtype=np.int64)
+    impostor = np.zeros(n_bins, dtype=np.int64)
+
+    x = np.ascontiguousarray(encodings, dtype=np.float32)
+    sq_norms = np.einsum("ij,ij->i", x, x)
+    _, label_ids = np.unique(labels, return_inverse=True)
+    n = len(x)
+
+    for start in range(0, n, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, n)
+        # Only pairs (i, j) with j > i, so each pair is counted once and self pairs are skipped
+        cols = slice(start + 1, n)
+        if start + 1 >= n:
+            break
+        d2 = sq_norms[start:stop, None] + sq_norms[None, cols] - 2.0 * (x[start:stop] @ x[cols].T)
+        distances = np.sqrt(np.maximum(d2, 0.0))
+
+        rows_idx = np.arange(start, stop)[:, None]
+        cols_idx = np.arange(start + 1, n)[None, :]
+        upper = cols_idx > rows_idx
+        same = label_ids[start:stop, None] == label_ids[None, cols]
+
+        bins = np.minimum((distances / BIN_WIDTH).astype(np.int64), n_bins - 1)
+        genuine += np.bincount(bins[upper & same], minlength=n_bins)
+        impostor += np.bincount(bins[upper & ~same], minlength=n_bins)
+
+    return genuine, impostor
+
+
+def error_curves(genuine: np.ndarray, impostor: np.ndarray) -> Dict[str, np.ndarray]:
+    """FAR and FRR when a pair is accepted for distance < threshold, for each bin edge."""
+    thresholds = np.arange(1, len(genuine) + 1) * BIN_WIDTH
+    genuine_total = max(int(genuine.sum()), 1)
+    impostor_total = max(int(impostor.sum()), 1)
+    far = np.cumsum(impostor) / impostor_total
+    frr = 1.0 - np.cumsum(genuine) / genuine_total
+    return {"threshold": thresholds, "far": far, "frr": frr}
+
+
+def recommend_threshold(curves: Dict[str, np.ndarray], target_far: float, has_genuine: bool) -> Dict[str, Optional[float]]:
+    """
+    The largest threshold whose FAR is within target_far. threshold, far and frr are
+    None when no threshold meets the target; frr and eer are None without genuine pairs.
+    """
+    result = {"threshold": None, "far": None, "frr": None, "eer": None}
+    within_target = np.nonzero(curves["far"] <= target_far)[0]
+    if len(within_target):
+        index = int(within_target[-1])
+        result["threshold"] = round(float(curves["threshold"][index]), 4)
+        result["far"] = float(curves["far"][index])
+        if has_genuine:
+            result["frr"] = float(curves["frr"][index])
+    if has_genuine:
+        eer_index = int(np.argmin(np.abs(curves["far"] - curves["frr"])))
+        result["eer"] = float((curves["far"][eer_index] + curves["frr"][eer_index]) / 2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate the face recognition match threshold.")
+    parser.add_argument("--source", choices=["db", "images", "npz"], default="db")
+    parser.add_argument("--images-dir", help="Directory laid out as <branch>/<person>/<image>")
+    parser.add_argument("--npz", help="Path to a .npz file with encodings, labels and optional branches")
+    parser.add_argument("--target-far", type=float, default=0.001, help="Highest acceptable false accept rate")
+    parser.add_argument("--curves-csv", help="Write the full FAR/FRR curves to this CSV file")
+    parser.add_argument("--write-tolerances", help="Write recommended thresholds as JSON for FACE_TOLERANCE_FILE")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.source == "db":
+        encodings, labels, branches = load_from_db()
+    elif args.source == "images":
+        if not args.images_dir:
+            parser.error("--images-dir is required for --source images")
+        encodings, labels, branches = load_from_images(args.images_dir)
+    else:
+        if not args.npz:
+            parser.error("--npz is required for --source npz")
+        encodings, labels, branches = load_from_npz(args.npz)
+
+    if len(encodings) < 2:
+        print("Need at least two face encodings to calibrate.", file=sys.stderr)
+        return 1
+
+    print(f"Loaded {len(encodings)} encodings in {time.perf_counter() - started:.2f}s")
+
+    # Trainers and admins match within their own branch; superadmins across all branches
+    groups = {"(all branches)": np.arange(len(encodings))}
+    for branch in sorted(set(branches.tolist()) - {""}):
+        groups[branch] = np.nonzero(branches == branch)[0]
+
+    recommendations = {}
+    all_curves = {}
+    unusable = {}  # group -> why its threshold must not be written
+    for name, index in groups.items():
+        if len(index) < 2:
+            continue
+        group_started = time.perf_counter()
+        genuine, impostor = distance_histograms(encodings[index], labels[index])
+        curves = error_curves(genuine, impostor)
+        has_genuine = genuine.sum() > 0
+        rec = recommend_threshold(curves, args.target_far, has_genuine)
+        recommendations[name] = rec
+        all_curves[name] = curves
+        if not has_genuine:
+            unusable[name] = "no genuine pairs, so the false reject rate is unknown"
+        elif rec["threshold"] is None:
+            unusable[name] = f"no threshold keeps FAR within {args.target_far}"
+
+        pairs_text = (
+            f"{name}: {len(index)} templates, {int(genuine.sum())} genuine / {int(impostor.sum())} impostor pairs "
+            f"in {time.perf_counter() - group_started:.2f}s"
+        )
+        if rec["threshold"] is None:
+            print(f"{pairs_text} -> no threshold meets FAR {args.target_far}")
+            continue
+        frr_text = f"{rec['frr']:.4f}" if rec["frr"] is not None else "n/a (no genuine pairs)"
+        eer_text = f", EER {rec['eer']:.4f}" if rec["eer"] is not None else ""
+        print(f"{pairs_text} -> threshold {rec['threshold']} (FAR {rec['far']:.5f}, FRR {frr_text}{eer_text})")
+
+    if args.curves_csv:
+        with open(args.curves_csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["group", "threshold", "far", "frr"])
+            for name, curves in all_curves.items():
+                for threshold, far, frr in zip(curves["threshold"], curves["far"], curves["frr"]):
+                    writer.writerow([name, f"{threshold:.3f}", f"{far:.6f}", f"{frr:.6f}"])
+        print(f"Wrote curves to {args.curves_csv}")
+
+    if args.write_tolerances:
+        # A threshold without genuine pairs or outside the FAR target would reject or
+        # accept faces blindly; refuse to write rather than ship it
+        if unusable:
+            for name, reason in unusable.items():
+                print(f"Not writing {args.write_tolerances}: {name}: {reason}.", file=sys.stderr)
+            if any(reason.startswith("no genuine") for reason in unusable.values()):
+                print("Calibrate with labelled images (--source images or npz) that have several per person.", file=sys.stderr)
+            return 2
+        overall = recommendations.get("(all branches)")
+        with open(args.write_tolerances, "w") as f:
+            json.dump({
+                "target_far": args.target_far,
+                "default": overall["threshold"] if overall else None,
+                "branches": {name: rec["threshold"] for name, rec in recommendations.items() if name != "(all branches)"},
+            }, f, indent=2)
+        print(f"Wrote tolerances to {args.write_tolerances}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+# backend/face_client.py
+# Entry point for face detection and matching from the API. With FACE_WORKER_MODE=inline
+# (the default) the work runs in this process as before; with FACE_WORKER_MODE=socket it
+# is sent to the face worker (`python -m app.face_worker`) over a Unix socket, so API
+# workers never load the face models.
+#
+# Wire format: each message is a 4-byte big-endian length followed by that many bytes
+# of UTF-8 JSON. Images travel base64-encoded.
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from typing import Optional, Set
+
+import numpy as np
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image
+from sqlalchemy import event, inspect, select
+
+from . import face_engine, metrics, models
+from .face_gallery import FaceGallery, FaceMatch, SearchQuery
+
+logger = logging.getLogger(__name__)
+
+FACE_WORKER_MODE = os.getenv("FACE_WORKER_MODE", "inline").lower()
+FACE_WORKER_SOCKET = os.getenv("FACE_WORKER_SOCKET", "/tmp/smartflex-face.sock")
+FACE_WORKER_TIMEOUT = float(os.getenv("FACE_WORKER_TIMEOUT", 30))
+FACE_WORKER_MAX_FRAME = int(os.getenv("FACE_WORKER_MAX_FRAME", 16 * 1024 * 1024))
+# Inline mode keeps the gallery per API worker and reloads it after this many seconds, so
+# enrollments made through another worker show up within that time
+FACE_INLINE_GALLERY_TTL = int(os.getenv("FACE_INLINE_GALLERY_TTL", 30))
+# How long the set of members with a paid fee is reused for active-only searches
+FACE_ACTIVE_MEMBERS_TTL = int(os.getenv("FACE_ACTIVE_MEMBERS_TTL", 30))
+
+# gallery_size is the number of enrolled faces the search covered; matches holds the
+# closest enrolled face for each face found in the image (None when nothing was searchable)
+Recognition = namedtuple("Recognition", ["gallery_size", "matches"])
+FaceEncoding = namedtuple("FaceEncoding", ["face_count", "encoding"])
+
+
+class FaceImageError(ValueError):
+    """The uploaded file could not be decoded as an image."""
+
+
+class FaceProcessingError(RuntimeError):
+    """Face detection or encoding failed."""
+
+
+_HEADER = struct.Struct(">I")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[dict]:
+    """Next message on the stream, or None once the peer has closed it."""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise
+    (length,) = _HEADER.unpack(header)
+    if length > FACE_WORKER_MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds FACE_WORKER_MAX_FRAME")
+    return json.loads(await reader.readexactly(length))
+
+
+async def write_frame(writer: asyncio.StreamWriter, message: dict):
+    body = json.dumps(message).encode()
+    writer.write(_HEADER.pack(len(body)) + body)
+    await writer.drain()
+
+
+def _unavailable(detail: str) -> HTTPException:
+    metrics.inc("face_client.unavailable")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": "5"},
+    )
+
+
+async def _call(request: dict) -> dict:
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_unix_connection(FACE_WORKER_SOCKET), FACE_WORKER_TIMEOUT
+        )
+    except (OSError, asyncio.TimeoutError) as e:
+        logger.error(f"Face worker unreachable at {FACE_WORKER_SOCKET}: {e}")
+        raise _unavailable("Face recognition service is unavailable. Please retry shortly.")
+
+    try:
+        await write_frame(writer, request)
+        response = await asyncio.wait_for(read_frame(reader), FACE_WORKER_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise _unavailable("Face recognition is busy. Please retry shortly.")
+    except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+        logger.error(f"Face worker request failed: {e}")
+        raise _unavailable("Face recognition service is unavailable. Please retry shortly.")
+    finally:
+        writer.close()
+
+    if response is None:
+        raise _unavailable("Face recognition service is unavailable. Please retry shortly.")
+    if not response.get("ok"):
+        if response.get("error") == "invalid_image":
+            raise FaceImageError(response.get("detail"))
+        raise FaceProcessingError(response.get("detail"))
+    return response
+
+
+def _decode_image(contents: bytes) -> np.ndarray:
+    try:
+        # Pillow gives 8-bit RGB, which face_recognition expects as a NumPy array
+        return np.array(Image.open(io.BytesIO(contents)).convert("RGB"))
+    except Exception as e:
+        raise FaceImageError(str(e))
+
+
+def _match_from_wire(match: Optional[dict]) -> Optional[FaceMatch]:
+    return FaceMatch(**match) if match else None
+
+
+_inline_lock = threading.Lock()
+_inline_cache = {"gallery": None, "loaded_at": 0.0, "generation": 0}
+_active_cache = {"user_ids": None, "loaded_at": 0.0}
+
+
+def _inline_gallery(db) -> FaceGallery:
+    """
+    All enrolled faces, cached in this process for FACE_INLINE_GALLERY_TTL seconds.
+    It is dropped by gallery_changed() and when a member's face, branch or name is
+    written through the ORM here. Callers narrow searches by branch and user ids
+    instead of rebuilding the gallery per request.
+    """
+    with _inline_lock:
+        cached = _inline_cache["gallery"]
+        if cached is not None and time.monotonic() - _inline_cache["loaded_at"] <= FACE_INLINE_GALLERY_TTL:
+            return cached
+        generation = _inline_cache["generation"]
+
+    rows = db.execute(
+        select(models.User.id, models.User.name, models.User.branch, models.User.face_encoding)
+        .where(models.User.face_encoding.isnot(None))
+    ).all()
+    gallery = FaceGallery.from_rows(rows)
+
+    with _inline_lock:
+        # An enrollment that changed while loading may be missing from these rows
+        if _inline_cache["generation"] == generation:
+            _inline_cache.update(gallery=gallery, loaded_at=time.monotonic())
+    return gallery
+
+
+def _forget_inline_gallery():
+    with _inline_lock:
+        _inline_cache.update(gallery=None, generation=_inline_cache["generation"] + 1)
+
+
+def _forget_changed_face(mapper, connection, target):
+    # Only writes that change what the gallery holds for this member
+    state = inspect(target)
+    if state.deleted or state.was_deleted or any(
+        state.attrs[name].history.has_changes() for name in ("face_encoding", "branch", "name")
+    ):
+        _forget_inline_gallery()
+
+
+for _event_name in ("after_update", "after_delete"):
+    event.listen(models.User, _event_name, _forget_changed_face)
+
+
+def _active_member_ids(db) -> Set[int]:
+    with _inline_lock:
+        cached = _active_cache["user_ids"]
+        if cached is not None and time.monotonic() - _active_cache["loaded_at"] <= FACE_ACTIVE_MEMBERS_TTL:
+            return cached
+
+    user_ids = set(db.scalars(
+        select(models.FeeAssignment.user_id).where(models.FeeAssignment.is_paid == True).distinct()
+    ))
+    with _inline_lock:
+        _active_cache.update(user_ids=user_ids, loaded_at=time.monotonic())
+    return user_ids
+
+
+async def recognize(
+    db,
+    contents: bytes,
+    branch: Optional[str] = None,
+    home_branch: Optional[str] = None,
+    active_only: bool = False,
+) -> Recognition:
+    """
+    Finds the faces in an uploaded image and the closest enrolled member for each.
+    branch limits the search to one branch (None searches all of them) and
+    active_only to members with a paid fee. Raises FaceImageError for an unreadable
+    image and FaceProcessingError when detection fails.
+    """
+    if FACE_WORKER_MODE == "socket":
+        response = await _call({
+            "op": "recognize",
+            "image": base64.b64encode(contents).decode(),
+            "branch": branch,
+            "home_branch": home_branch,
+            "active_only": active_only,
+        })
+        return Recognition(response["gallery_size"], [_match_from_wire(m) for m in response["matches"]])
+
+    img_np = _decode_image(contents)
+    logger.info(f"Image loaded successfully. Shape: {img_np.shape}")
+
+    gallery = await run_in_threadpool(_inline_gallery, db)
+    user_ids = await run_in_threadpool(_active_member_ids, db) if active_only else None
+    gallery_size = gallery.count(branch, user_ids)
+    if not gallery_size:
+        return Recognition(0, [])
+
+    try:
+        # Run the CPU-heavy detection off the event loop so other requests keep flowing
+        face_locations = await run_in_threadpool(face_engine.face_locations, img_np, model="hog")
+        encodings = await run_in_threadpool(face_engine.face_encodings, img_np, face_locations)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise FaceProcessingError(str(e))
+
+    # Every face in the image is matched in one matrix product per branch partition
+    queries = [SearchQuery(e, home_branch, branch, user_ids) for e in encodings]
+    matches = await run_in_threadpool(gallery.search_batch, queries) if queries else []
+    return Recognition(gallery_size, matches)
+
+
+async def encode_face(contents: bytes) -> FaceEncoding:
+    """
+    Counts the faces in an uploaded image and, when there is exactly one, returns
+    its 128-d encoding. Raises FaceImageError / FaceProcessingError like recognize().
+    """
+    if FACE_WORKER_MODE == "socket":
+        response = await _call({"op": "encode", "image": base64.b64encode(contents).decode()})
+        encoding = response["encoding"]
+        return FaceEncoding(response["face_count"], np.array(encoding, dtype=np.float64) if encoding else None)
+
+    img_np = _decode_image(contents)
+    try:
+        face_locations = await run_in_threadpool(face_engine.face_locations, img_np, model="hog")
+        if len(face_locations) != 1:
+            return FaceEncoding(len(face_locations), None)
+        encodings = await run_in_threadpool(face_engine.face_encodings, img_np, face_locations)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise FaceProcessingError(str(e))
+    return FaceEncoding(1, encodings[0] if encodings else None)
+
+
+async def gallery_changed(user_id: int):
+    """
+    Tells the face worker that a member's enrolled face was added, replaced or
+    removed, so it reloads that member. A failure is only logged: the worker also
+    reloads the whole gallery periodically. Inline, this process's cached gallery
+    is dropped instead.
+    """
+    if FACE_WORKER_MODE != "socket":
+        _forget_inline_gallery()
+        return
+    try:
+        await _call({"op": "reload_user", "user_id": user_id})
+    except (HTTPException, FaceProcessingError) as e:
+        logger.warning(f"Face worker not told about user {user_id}: {getattr(e, 'detail', e)}")
@@ -0,0 +1,58 @@
+# backend/face_engine.py
+# face_recognition loads the dlib models when it is imported, which dominates worker
+# start-up time and memory. It is imported here on first use instead of with the app,
+# so workers that only serve auth and fee requests never pay for it.
+import os
+import time
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+
+from . import metrics
+
+FACE_RECOGNITION_ENABLED = os.getenv("FACE_RECOGNITION_ENABLED", "true").lower() == "true"
+
+
+@lru_cache(maxsize=None)
+def _load():
+    started = time.perf_counter()
+    import face_recognition
+
+    metrics.observe("face_engine.load", time.perf_counter() - started)
+    return face_recognition
+
+
+def require_face_recognition():
+    """Route dependency: turns face endpoints away with 503 before any work is queued."""
+    if not FACE_RECOGNITION_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition is disabled on this server.",
+        )
+
+
+def get_face_recognition():
+    """The face_recognition module, imported on first call."""
+    require_face_recognition()
+    return _load()
+
+
+def preload():
+    """
+    Imports the models ahead of the first request. Called from the gunicorn master
+    when preloading, so forked workers share the model pages copy-on-write.
+    """
+    if FACE_RECOGNITION_ENABLED:
+        _load()
+
+
+def face_locations(img, **kwargs):
+    return get_face_recognition().face_locations(img, **kwargs)
+
+
+def face_encodings(img, known_face_locations=None):
+    return get_face_recognition().face_encodings(img, known_face_locations)
+
+
+def compare_faces(known_face_encodings, face_encoding_to_check, tolerance=0.6):
+    return get_face_recognition().compare_faces(known_face_encodings, face_encoding_to_check, tolerance)
@@ -0,0 +1,243 @@
+# backend/face_gallery.py
+# In-memory gallery of enrolled face encodings, partitioned per branch.
+import json
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Maximum face distance accepted as a match. Per-branch values can be calibrated with
+# `python -m app.face_calibration` and loaded from the JSON file in FACE_TOLERANCE_FILE,
+# whose values take precedence; this is the fallback when no file value applies.
+DEFAULT_TOLERANCE = float(os.getenv("FACE_MATCH_TOLERANCE", 0.5))
+
+# A match closer than this in the home branch is accepted without searching other branches
+CONFIDENT_DISTANCE = float(os.getenv("FACE_CONFIDENT_DISTANCE", 0.4))
+
+
+def _load_tolerance_file() -> Dict:
+    path = os.getenv("FACE_TOLERANCE_FILE")
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Could not load face tolerances from {path}: {e}")
+        return {}
+
+
+_calibrated = _load_tolerance_file()
+_calibrated_default = _calibrated.get("default")
+_branch_tolerances = {branch: float(value) for branch, value in _calibrated.get("branches", {}).items()}
+
+
+def tolerance_for(branch: Optional[str]) -> float:
+    """
+    The branch's value from FACE_TOLERANCE_FILE, else the file's calibrated default,
+    else FACE_MATCH_TOLERANCE (0.5 when unset).
+    """
+    if branch in _branch_tolerances:
+        return _branch_tolerances[branch]
+    if _calibrated_default is not None:
+        return float(_calibrated_default)
+    return DEFAULT_TOLERANCE
+
+
+_search_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FACE_GALLERY_SEARCH_THREADS", 4)),
+    thread_name_prefix="face-gallery",
+)
+
+FaceMatch = namedtuple("FaceMatch", ["user_id", "name", "branch", "distance"])
+
+# One face to look up in search_batch: branch limits the search to that partition (None
+# searches every branch) and user_ids, when set, to those members
+SearchQuery = namedtuple("SearchQuery", ["encoding", "home_branch", "branch", "user_ids"])
+
+
+class GalleryPartition:
+    def __init__(self, branch: Optional[str], user_ids: List[int], names: List[str], encodings: List[np.ndarray]):
+        self.branch = branch
+        self.user_ids = user_ids
+        self.names = names
+        self.encodings = np.vstack(encodings)
+        self._index()
+
+    def _index(self):
+        self.id_array = np.array(self.user_ids)
+        self.sq_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __contains__(self, user_id: int):
+        return user_id in self.user_ids
+
+    def nearest(self, encoding: np.ndarray) -> FaceMatch:
+        # Same Euclidean distance face_recognition.face_distance uses, over the whole partition at once
+        distances = np.linalg.norm(self.encodings - encoding, axis=1)
+        index = int(np.argmin(distances))
+        return FaceMatch(self.user_ids[index], self.names[index], self.branch, float(distances[index]))
+
+    def nearest_many(self, encodings: np.ndarray, allowed: List[Optional[Set[int]]]) -> List[Optional[FaceMatch]]:
+        """
+        Closest face for each row of encodings, from one matrix product over the
+        partition. allowed[i], when set, limits row i to those user ids; rows with
+        no allowed faces get None.
+        """
+        # |a - b|^2 = |a|^2 + |b|^2 - 2a.b
+        squared = (
+            np.einsum("ij,ij->i", encodings, encodings)[:, None]
+            + self.sq_norms[None, :]
+            - 2.0 * encodings @ self.encodings.T
+        )
+        for row, user_ids in enumerate(allowed):
+            if user_ids is not None:
+                squared[row, ~np.isin(self.id_array, list(user_ids))] = np.inf
+
+        indexes = np.argmin(squared, axis=1)
+        matches = []
+        for row, index in enumerate(indexes):
+            distance = squared[row, index]
+            if np.isinf(distance):
+                matches.append(None)
+            else:
+                matches.append(FaceMatch(self.user_ids[index], self.names[index], self.branch, float(np.sqrt(max(distance, 0.0)))))
+        return matches
+
+    def count(self, user_ids: Optional[Set[int]] = None) -> int:
+        if user_ids is None:
+            return len(self)
+        return int(np.isin(self.id_array, list(user_ids)).sum())
+
+    def put(self, user_id: int, name: str, encoding: np.ndarray):
+        if user_id in self.user_ids:
+            index = self.user_ids.index(user_id)
+            self.names[index] = name
+            self.encodings = self.encodings.copy()
+            self.encodings[index] = encoding
+        else:
+            self.user_ids.append(user_id)
+            self.names.append(name)
+            self.encodings = np.vstack([self.encodings, encoding])
+        self._index()
+
+    def remove(self, user_id: int):
+        index = self.user_ids.index(user_id)
+        del self.user_ids[index]
+        del self.names[index]
+        self.encodings = np.delete(self.encodings, index, axis=0)
+        self._index()
+
+
+class FaceGallery:
+    def __init__(self, partitions: Dict[Optional[str], GalleryPartition]):
+        self.partitions = partitions
+
+    @classmethod
+    def from_rows(cls, rows: Iterable) -> "FaceGallery":
+        """Builds a gallery from rows exposing id, name, branch and face_encoding."""
+        grouped: Dict[Optional[str], tuple] = {}
+        for row in rows:
+            try:
+                encoding = np.frombuffer(row.face_encoding, dtype=np.float64)
+            except Exception as e:
+                logger.warning(f"Error loading face encoding for user {row.id}: {e}")
+                continue
+            user_ids, names, encodings = grouped.setdefault(row.branch, ([], [], []))
+            user_ids.append(row.id)
+            names.append(row.name)
+            encodings.append(encoding)
+
+        return cls({
+            branch: GalleryPartition(branch, user_ids, names, encodings)
+            for branch, (user_ids, names, encodings) in grouped.items()
+        })
+
+    def __len__(self):
+        return sum(len(p) for p in self.partitions.values())
+
+    def search(self, encoding: np.ndarray, home_branch: Optional[str] = None) -> Optional[FaceMatch]:
+        """
+        Returns the closest enrolled face (None for an empty gallery); callers
+        compare its distance against tolerance_for(match.branch). The home branch
+        is searched first and a confident match there skips the other branches;
+        otherwise the remaining partitions are searched in parallel and merged by
+        distance.
+        """
+        candidates = []
+        remaining = list(self.partitions.values())
+
+        home = self.partitions.get(home_branch) if home_branch else None
+        if home is not None:
+            best_home = home.nearest(encoding)
+            if best_home.distance < min(CONFIDENT_DISTANCE, tolerance_for(home.branch)):
+                return best_home
+            candidates.append(best_home)
+            remaining = [p for p in remaining if p is not home]
+
+        if len(remaining) > 1:
+            candidates.extend(_search_executor.map(lambda p: p.nearest(encoding), remaining))
+        else:
+            candidates.extend(p.nearest(encoding) for p in remaining)
+
+        if not candidates:
+            return None
+
+        return min(candidates, key=lambda m: m.distance)
+
+    def search_batch(self, queries: List[SearchQuery]) -> List[Optional[FaceMatch]]:
+        """
+        Same result as search() for each query, but every partition is matched
+        against all the queries that include it in a single matrix product.
+        """
+        candidates: List[List[FaceMatch]] = [[] for _ in queries]
+        for partition in self.partitions.values():
+            rows = [i for i, q in enumerate(queries) if q.branch is None or q.branch == partition.branch]
+            if not rows:
+                continue
+            encodings = np.vstack([queries[i].encoding for i in rows])
+            for i, match in zip(rows, partition.nearest_many(encodings, [queries[i].user_ids for i in rows])):
+                if match is not None:
+                    candidates[i].append(match)
+
+        results: List[Optional[FaceMatch]] = []
+        for query, found in zip(queries, candidates):
+            if not found:
+                results.append(None)
+                continue
+            home = next((m for m in found if query.home_branch and m.branch == query.home_branch), None)
+            if home is not None and home.distance < min(CONFIDENT_DISTANCE, tolerance_for(home.branch)):
+                results.append(home)
+            else:
+                results.append(min(found, key=lambda m: m.distance))
+        return results
+
+    def count(self, branch: Optional[str] = None, user_ids: Optional[Set[int]] = None) -> int:
+        """Number of enrolled faces a query with this branch and user_ids would search."""
+        return sum(
+            p.count(user_ids) for p in self.partitions.values() if branch is None or p.branch == branch
+        )
+
+    def put(self, user_id: int, name: str, branch: Optional[str], encoding: np.ndarray):
+        """Adds or replaces one member's face, moving it if their branch changed."""
+        for partition in list(self.partitions.values()):
+            if user_id in partition and partition.branch != branch:
+                self.remove(user_id)
+        if branch in self.partitions:
+            self.partitions[branch].put(user_id, name, encoding)
+        else:
+            self.partitions[branch] = GalleryPartition(branch, [user_id], [name], [encoding])
+
+    def remove(self, user_id: int):
+        for branch, partition in list(self.partitions.items()):
+            if user_id in partition:
+                partition.remove(user_id)
+                if not len(partition):
+                    del self.partitions[branch]
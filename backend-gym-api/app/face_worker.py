@@ -0,0 +1,283 @@
+# backend/face_worker.py
+"""
+Face recognition service for FACE_WORKER_MODE=socket.
+
+Listens on the Unix socket in FACE_WORKER_SOCKET (see app/face_client.py for the
+wire format) and keeps the enrolled-face gallery in memory, so API workers neither
+load the face models nor rebuild the gallery per request. Jobs are collected into
+batches: HOG detection and encoding for the batch run in parallel on a pool of
+forked processes that share the preloaded models, then every face found in the
+batch is matched against the gallery in one matrix product per branch.
+
+    python -m app.face_worker
+    python -m app.face_worker --processes 4 --batch-size 16 --batch-wait-ms 20
+
+Run it on the same host as the API, as a user that can read and write the socket.
+"""
+import argparse
+import asyncio
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Set
+
+import numpy as np
+from PIL import Image
+from sqlalchemy import select
+
+from . import database, face_client, face_engine, models
+from .face_gallery import FaceGallery, SearchQuery
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FACE_WORKER_PROCESSES = int(os.getenv("FACE_WORKER_PROCESSES", os.cpu_count() or 1))
+FACE_WORKER_BATCH_SIZE = int(os.getenv("FACE_WORKER_BATCH_SIZE", 16))
+FACE_WORKER_BATCH_WAIT_MS = int(os.getenv("FACE_WORKER_BATCH_WAIT_MS", 20))
+# The gallery is reloaded in full on this interval, in case a reload_user message was missed
+FACE_GALLERY_REFRESH_SECONDS = int(os.getenv("FACE_GALLERY_REFRESH_SECONDS", 300))
+
+
+def _detect(contents: bytes, single: bool) -> dict:
+    """Runs in a pool process: decode, find faces, encode them. single stops unless there is exactly one face."""
+    try:
+        img_np = np.array(Image.open(io.BytesIO(contents)).convert("RGB"))
+    except Exception as e:
+        return {"error": "invalid_image", "detail": str(e)}
+    try:
+        face_locations = face_engine.face_locations(img_np, model="hog")
+        if single and len(face_locations) != 1:
+            return {"face_count": len(face_locations), "encodings": []}
+        encodings = face_engine.face_encodings(img_np, face_locations)
+    except Exception as e:
+        return {"error": "detection_failed", "detail": str(e)}
+    return {"face_count": len(face_locations), "encodings": encodings}
+
+
+def _load_gallery() -> FaceGallery:
+    db = database.SessionLocal()
+    try:
+        rows = db.execute(
+            select(models.User.id, models.User.name, models.User.branch, models.User.face_encoding)
+            .where(models.User.face_encoding.isnot(None))
+        ).all()
+    finally:
+        db.close()
+    return FaceGallery.from_rows(rows)
+
+
+def _load_user(user_id: int):
+    db = database.SessionLocal()
+    try:
+        return db.execute(
+            select(models.User.id, models.User.name, models.User.branch, models.User.face_encoding)
+            .where(models.User.id == user_id)
+        ).first()
+    finally:
+        db.close()
+
+
+def _load_active_member_ids() -> Set[int]:
+    db = database.SessionLocal()
+    try:
+        return set(db.scalars(
+            select(models.FeeAssignment.user_id).where(models.FeeAssignment.is_paid == True).distinct()
+        ))
+    finally:
+        db.close()
+
+
+class Job:
+    def __init__(self, request: dict, image: bytes):
+        self.request = request
+        self.image = image
+        self.gallery_size = 0
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class FaceWorker:
+    def __init__(self, processes: int, batch_size: int, batch_wait: float):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.gallery = FaceGallery({})
+        self._active_ids: Optional[Set[int]] = None
+        self._active_ids_at = 0.0
+
+        # Load the models once, then fork the pool so every process shares them
+        face_engine.preload()
+        self.pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("fork"))
+        # Start the processes now, before any threads exist in this process
+        for future in [self.pool.submit(int) for _ in range(processes)]:
+            future.result()
+
+    async def reload_gallery(self):
+        started = time.perf_counter()
+        self.gallery = await asyncio.get_running_loop().run_in_executor(None, _load_gallery)
+        logger.info(f"Face gallery loaded: {len(self.gallery)} faces in {time.perf_counter() - started:.2f}s")
+
+    async def reload_user(self, user_id: int):
+        row = await asyncio.get_running_loop().run_in_executor(None, _load_user, user_id)
+        if row is None or row.face_encoding is None:
+            self.gallery.remove(user_id)
+        else:
+            self.gallery.put(row.id, row.name, row.branch, np.frombuffer(row.face_encoding, dtype=np.float64))
+
+    async def active_member_ids(self) -> Set[int]:
+        if self._active_ids is None or time.monotonic() - self._active_ids_at > face_client.FACE_ACTIVE_MEMBERS_TTL:
+            self._active_ids = await asyncio.get_running_loop().run_in_executor(None, _load_active_member_ids)
+            self._active_ids_at = time.monotonic()
+        return self._active_ids
+
+    async def refresh_loop(self):
+        while True:
+            await asyncio.sleep(FACE_GALLERY_REFRESH_SECONDS)
+            try:
+                await self.reload_gallery()
+            except Exception as e:
+                logger.error(f"Face gallery reload failed: {e}")
+
+    async def batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(jobs) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    jobs.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self.process_batch(jobs)
+            except Exception as e:
+                logger.exception("Face batch failed")
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_result({"ok": False, "error": "detection_failed", "detail": str(e)})
+
+    async def process_batch(self, jobs: List[Job]):
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        detections = await asyncio.gather(*[
+            loop.run_in_executor(
+                self.pool, _detect, job.image, job.request["op"] == "encode"
+            )
+            for job in jobs
+        ])
+
+        active_ids = None
+        if any(job.request.get("active_only") for job in jobs):
+            active_ids = await self.active_member_ids()
+
+        # Every face from every recognize job in the batch, matched in one pass
+        queries, owners = [], []
+        for job, found in zip(jobs, detections):
+            if job.request["op"] != "recognize" or "error" in found:
+                continue
+            user_ids = active_ids if job.request.get("active_only") else None
+            branch = job.request.get("branch")
+            job.gallery_size = self.gallery.count(branch, user_ids)
+            if not job.gallery_size:
+                continue
+            for encoding in found["encodings"]:
+                queries.append(SearchQuery(encoding, job.request.get("home_branch"), branch, user_ids))
+                owners.append(job)
+        matches = self.gallery.search_batch(queries) if queries else []
+
+        results = {id(job): [] for job in jobs}
+        for job, match in zip(owners, matches):
+            results[id(job)].append(match._asdict() if match else None)
+
+        for job, found in zip(jobs, detections):
+            if "error" in found:
+                response = {"ok": False, **found}
+            elif job.request["op"] == "encode":
+                encoding = found["encodings"][0].tolist() if found["encodings"] else None
+                response = {"ok": True, "face_count": found["face_count"], "encoding": encoding}
+            else:
+                response = {"ok": True, "gallery_size": job.gallery_size, "matches": results[id(job)]}
+            job.future.set_result(response)
+
+        logger.info(f"Processed {len(jobs)} face jobs ({len(queries)} faces) in {time.perf_counter() - started:.2f}s")
+
+    async def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op in ("recognize", "encode"):
+            try:
+                image = base64.b64decode(request["image"], validate=True)
+            except (KeyError, TypeError, ValueError):
+                return {"ok": False, "error": "bad_request", "detail": "image must be base64"}
+            job = Job(request, image)
+            await self.queue.put(job)
+            return await job.future
+        if op == "reload_user":
+            await self.reload_user(int(request["user_id"]))
+            return {"ok": True}
+        if op == "ping":
+            return {"ok": True, "gallery_size": len(self.gallery)}
+        return {"ok": False, "error": "bad_request", "detail": f"Unknown op {op!r}"}
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await face_client.read_frame(reader)
+                except ValueError as e:
+                    await face_client.write_frame(writer, {"ok": False, "error": "bad_request", "detail": str(e)})
+                    break
+                if request is None:
+                    break
+                await face_client.write_frame(writer, await self.handle(request))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str):
+        await self.reload_gallery()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(self.serve_connection, path=socket_path)
+        os.chmod(socket_path, 0o660)
+        logger.info(f"Face worker listening on {socket_path}")
+
+        tasks = [asyncio.create_task(self.batch_loop()), asyncio.create_task(self.refresh_loop())]
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the face recognition worker.")
+    parser.add_argument("--socket", default=face_client.FACE_WORKER_SOCKET, help="Unix socket to listen on")
+    parser.add_argument("--processes", type=int, default=FACE_WORKER_PROCESSES, help="Detection processes")
+    parser.add_argument("--batch-size", type=int, default=FACE_WORKER_BATCH_SIZE, help="Most jobs per batch")
+    parser.add_argument("--batch-wait-ms", type=int, default=FACE_WORKER_BATCH_WAIT_MS, help="How long a batch waits to fill")
+    args = parser.parse_args(argv)
+
+    if not face_engine.FACE_RECOGNITION_ENABLED:
+        print("FACE_RECOGNITION_ENABLED is false; the face worker has nothing to do.")
+        return 1
+
+    worker = FaceWorker(args.processes, args.batch_size, args.batch_wait_ms / 1000)
+    try:
+        asyncio.run(worker.serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
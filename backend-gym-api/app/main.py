@@ -1,12 +1,26 @@
 # backend/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from . import models, database
-from .routers import users, auth, trainers, membership_plans, analytics, face_enrollment, face_attendance  # ⬅️ Add this
-
-models.Base.metadata.create_all(bind=database.engine)
+from . import database, email_outbox, email_templates, pagination, schema
+from .routers import users, auth, trainers, membership_plans, analytics, face_enrollment, face_attendance, metrics  # ⬅️ Add this
 
 app = FastAPI()
+
+# Request sessions check out a pool connection on first use; a pool timeout there is a 503
+app.add_exception_handler(database.PoolTimeoutError, database.pool_timeout_handler)
+
+@app.on_event("startup")
+def check_schema():
+    schema.check_schema_revision()
+
+@app.on_event("startup")
+def start_email_outbox():
+    email_templates.load_templates()
+    email_outbox.sender.start()
+
+@app.on_event("shutdown")
+def stop_email_outbox():
+    email_outbox.sender.stop()
 # print("--- FastAPI app initialized and CORS middleware configured! ---")
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +28,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset-paginated lists return their cursors in headers
+    expose_headers=[pagination.NEXT_CURSOR_HEADER, pagination.LATEST_CURSOR_HEADER],
 )
 
 app.include_router(users.router)
@@ -29,4 +45,6 @@ app.include_router(membership_plans.router)
 app.include_router(analytics.router)
 
 app.include_router(face_enrollment.router)
-app.include_router(face_attendance.router)
\ No newline at end of file
+app.include_router(face_attendance.router)
+
+app.include_router(metrics.router)
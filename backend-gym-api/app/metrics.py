@@ -0,0 +1,43 @@
+# backend/metrics.py
+# Lightweight in-process metrics (per worker). Exposed as JSON on GET /metrics (superadmins only).
+import threading
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_timings: Dict[str, Dict[str, float]] = {}
+
+
+def inc(name: str, value: float = 1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, seconds: float):
+    """Records one duration sample (count, total, max) under the given name."""
+    with _lock:
+        timing = _timings.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        timing["count"] += 1
+        timing["total_seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+
+def snapshot() -> Dict:
+    with _lock:
+        timings = {}
+        for name, t in _timings.items():
+            timings[name] = {
+                **t,
+                "avg_seconds": t["total_seconds"] / t["count"] if t["count"] else 0.0,
+            }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": timings,
+        }
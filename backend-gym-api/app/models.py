@@ -1,5 +1,5 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Time
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Time, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 from sqlalchemy import Boolean, DateTime, func, LargeBinary # Keep these imports
@@ -28,6 +28,11 @@ class User(Base):
     exercise_plans = relationship("ExercisePlan", back_populates="user")
     fee_assignments = relationship("FeeAssignment", foreign_keys="[FeeAssignment.user_id]", back_populates="user_assigned_to")
     assigned_fees = relationship("FeeAssignment", foreign_keys="[FeeAssignment.assigned_by_user_id]", back_populates="assigned_by_user")
+
+    __table_args__ = (
+        # Login and token lookups match emails case-insensitively (crud.identity_lookup)
+        Index("ix_users_email_lower", func.lower(email)),
+    )
     session_attendances = relationship("SessionAttendance", back_populates="user")
     user_notifications = relationship("UserNotification", back_populates="user")
     # ⬅️ Corrected: Add relationships for PTO requests
@@ -59,6 +64,11 @@ class Trainer(Base):
     assigned_exercise_plans = relationship("ExercisePlan", back_populates="assigned_by_trainer")
     pto_requests = relationship("PTORequest", back_populates="trainer")
 
+    __table_args__ = (
+        # Login and token lookups match emails case-insensitively (crud.identity_lookup)
+        Index("ix_trainers_email_lower", func.lower(email)),
+    )
+
 
 # New Model for PTO Requests ⬅️ NEW MODEL
 class PTORequest(Base):
@@ -97,6 +107,11 @@ class DietPlan(Base):
     user = relationship("User", back_populates="diet_plans")
     assigned_by_trainer = relationship("Trainer", back_populates="assigned_diet_plans")
 
+    __table_args__ = (
+        # Plan expiry reminders scan expiry_date ranges
+        Index("ix_diet_plans_expiry_date", "expiry_date"),
+    )
+
 
 # New Model for Exercise Plan
 class ExercisePlan(Base):
@@ -114,6 +129,11 @@ class ExercisePlan(Base):
     user = relationship("User", back_populates="exercise_plans")
     assigned_by_trainer = relationship("Trainer", back_populates="assigned_exercise_plans")
 
+    __table_args__ = (
+        # Plan expiry reminders scan expiry_date ranges
+        Index("ix_exercise_plans_expiry_date", "expiry_date"),
+    )
+
 
 class UserAttendance(Base): # New Model for User Attendance
     __tablename__ = "user_attendance"
@@ -127,6 +147,48 @@ class UserAttendance(Base): # New Model for User Attendance
 
     # user = relationship("User", back_populates="attendance_records")
 
+    __table_args__ = (
+        # One record per member per day; attendance.upsert_attendance conflicts on it
+        UniqueConstraint("user_id", "date", name="uq_user_attendance_user_date"),
+        # Branch dashboards filter on branch and a date range (attendance-stats)
+        Index("ix_user_attendance_branch_date", "branch", "date"),
+    )
+
+
+# Attendance events uploaded by kiosks after working offline. The event_uuid is
+# generated on the kiosk, so replaying a batch never marks attendance twice.
+class KioskAttendanceEvent(Base):
+    __tablename__ = "kiosk_attendance_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_uuid = Column(String, unique=True, index=True, nullable=False)
+    kiosk_id = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_time = Column(DateTime, nullable=False)
+    result = Column(String, nullable=False)
+    received_at = Column(DateTime, default=func.now())
+
+# Outbound emails. Request handlers insert rows in their own transaction and the
+# background sender in email_outbox.py delivers them with retries.
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_content = Column(String, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending, sent, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # The sender polls for due pending messages
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
 # New Model for Session Schedules
 class SessionSchedule(Base):
     __tablename__ = "session_schedules"
@@ -243,6 +305,15 @@ class FeeAssignment(Base):
     assigned_by_user = relationship("User", foreign_keys=[assigned_by_user_id], back_populates="assigned_fees")
     receipts = relationship("FeeReceipt", back_populates="fee_assignment", cascade="all, delete-orphan") # ⬅️ NEW: Relationship to receipts
 
+    __table_args__ = (
+        # Reminder scans walk unpaid fees in (due_date, id) keyset order
+        Index("ix_fee_assignments_is_paid_due_date_id", "is_paid", "due_date", "id"),
+        # Fee listings page on (due_date, id), overall, per branch and per member
+        Index("ix_fee_assignments_due_date_id", "due_date", "id"),
+        Index("ix_fee_assignments_branch_due_date_id", "branch_name", "due_date", "id"),
+        Index("ix_fee_assignments_user_due_date_id", "user_id", "due_date", "id"),
+    )
+
 class FeeReceipt(Base): # ⬅️ NEW: Table for storing receipts
     __tablename__ = "fee_receipts"
 
@@ -256,7 +327,27 @@ class FeeReceipt(Base): # ⬅️ NEW: Table for storing receipts
 
     fee_assignment = relationship("FeeAssignment", back_populates="receipts")
     user = relationship("User")
+
+    __table_args__ = (
+        # Monthly revenue rollups filter and group on payment_date
+        Index("ix_fee_receipts_payment_date", "payment_date"),
+    )
     
+# One row per reminder sent, so a reminder run can be repeated without
+# notifying anyone twice for the same stage.
+class ReminderSent(Base):
+    __tablename__ = "reminders_sent"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # fee, diet_plan, exercise_plan
+    target_id = Column(Integer, nullable=False)
+    stage = Column(String, nullable=False)  # due_soon, due_today, overdue, expiring
+    sent_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("kind", "target_id", "stage", name="uq_reminders_sent_kind_target_stage"),
+    )
+
 class UserNotification(Base):
     __tablename__ = "user_notifications"
 
@@ -269,6 +360,18 @@ class UserNotification(Base):
 
     user = relationship("User", back_populates="user_notifications")
 
+    __table_args__ = (
+        # Notifications feed: newest first per user, keyset-paginated on (created_at, id)
+        Index("ix_user_notifications_user_created_id", "user_id", "created_at", "id"),
+        # Partial index: only unread rows, for mark-all-read and the unread count
+        Index(
+            "ix_user_notifications_unread",
+            "user_id",
+            postgresql_where=(is_read == False),
+            sqlite_where=(is_read == False),
+        ),
+    )
+
 class MembershipPlan(Base):
     __tablename__ = "membership_plans"
 
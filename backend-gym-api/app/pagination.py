@@ -0,0 +1,39 @@
+# backend/pagination.py
+# Opaque keyset cursors. List endpoints keep returning plain JSON arrays and pass
+# the cursor for the next page in the X-Next-Cursor response header.
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+LATEST_CURSOR_HEADER = "X-Latest-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Decodes a cursor made by encode_cursor into values of the given types (datetime, date, int, str, ...)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("cursor has the wrong shape")
+        values = []
+        for value, kind in zip(payload, types):
+            if kind in (date, datetime):
+                values.append(kind.fromisoformat(value))
+            else:
+                values.append(kind(value))
+        return tuple(values)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def set_cursor_header(response: Response, header: str, cursor):
+    if cursor:
+        response.headers[header] = cursor
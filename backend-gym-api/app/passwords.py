@@ -0,0 +1,107 @@
+# backend/passwords.py
+# bcrypt hashing and verification on a dedicated, bounded executor. Each call costs
+# ~250ms of CPU; keeping them off the shared request threadpool means a login rush
+# queues here (and is turned away with 503 once the queue is full) instead of
+# starving every other endpoint.
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from . import metrics
+
+# Cost for new hashes. Hashes at any other cost are rehashed on the next successful login,
+# so the cost can be tuned without a password reset.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", 2))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_lock = threading.Lock()
+_pending = 0
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="The server is busy. Please retry shortly.",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+def _submit(name: str, fn, *args):
+    """Queues fn on the hashing executor, or raises 503 when the queue is full."""
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE:
+            metrics.inc("passwords.rejected")
+            raise _busy()
+        _pending += 1
+        metrics.set_gauge("passwords.pending", _pending)
+
+    queued_at = time.perf_counter()
+
+    def run():
+        started_at = time.perf_counter()
+        metrics.observe("passwords.queue_wait", started_at - queued_at)
+        try:
+            return fn(*args)
+        finally:
+            metrics.observe(f"passwords.{name}", time.perf_counter() - started_at)
+
+    def done(_future):
+        global _pending
+        with _lock:
+            _pending -= 1
+            metrics.set_gauge("passwords.pending", _pending)
+
+    future = _executor.submit(run)
+    future.add_done_callback(done)
+    return future
+
+
+def _verify_and_update(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    if not hashed_password:
+        return False, None
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except ValueError:
+        # Not a hash this context recognises
+        return False, None
+
+
+def hash_password(password: str) -> str:
+    """Blocking variant for sync endpoints."""
+    return _submit("hash", pwd_context.hash, password).result()
+
+
+def verify_password(plain_password: str, hashed_password: Optional[str]) -> bool:
+    return _submit("verify", _verify_and_update, plain_password, hashed_password).result()[0]
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit("hash", pwd_context.hash, password))
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Returns (valid, new_hash). new_hash is set when the stored hash was made with a
+    different cost and should be replaced by the caller.
+    """
+    return await asyncio.wrap_future(
+        _submit("verify", _verify_and_update, plain_password, hashed_password)
+    )
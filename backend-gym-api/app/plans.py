@@ -0,0 +1,95 @@
+# backend/plans.py
+# Listing and serialization shared by the diet and exercise plan endpoints.
+from typing import List, Optional, Type, Union
+
+from fastapi import Response
+from sqlalchemy.orm import Session, contains_eager, joinedload
+
+from . import models, pagination, schemas
+
+PLANS_DEFAULT_LIMIT = 100
+PLANS_MAX_LIMIT = 500
+
+PlanModel = Union[Type[models.DietPlan], Type[models.ExercisePlan]]
+
+
+def split_specialization(specialization) -> List[str]:
+    return specialization.split(",") if isinstance(specialization, str) and specialization else []
+
+
+def trainer_response(
+    trainer: Optional[models.Trainer],
+    trainer_id: int,
+    name: str = "Unknown Trainer",
+    branch_name: Optional[str] = None,
+) -> schemas.TrainerResponse:
+    """
+    TrainerResponse for a Trainer row, with specialization split into a list without
+    touching the ORM object. A missing trainer gets a placeholder built from the
+    given id, name and branch.
+    """
+    if trainer is None:
+        return schemas.TrainerResponse(
+            id=trainer_id, name=name, specialization=[], rating=0.0, experience=0,
+            phone="", email="", availability=None, branch_name=branch_name
+        )
+    data = {field: getattr(trainer, field) for field in schemas.TrainerResponse.model_fields}
+    data["specialization"] = split_specialization(trainer.specialization)
+    return schemas.TrainerResponse(**data)
+
+
+def user_response(user: Optional[models.User], user_id: int) -> schemas.UserResponse:
+    if user is None:
+        return schemas.UserResponse(id=user_id, name="Unknown User", email="", phone="", role="member", branch=None, gender=None)
+    return schemas.UserResponse.from_orm(user)
+
+
+def plan_response(plan, response_model, trainer_name: str = "Unknown Trainer", trainer_branch: Optional[str] = None):
+    """
+    Serializes a DietPlan or ExercisePlan into response_model from its loaded user and
+    assigned_by_trainer. trainer_name and trainer_branch fill in for a missing trainer.
+    """
+    return response_model(
+        id=plan.id,
+        user_id=plan.user_id,
+        assigned_by_trainer_id=plan.assigned_by_trainer_id,
+        title=plan.title,
+        description=plan.description,
+        assigned_date=plan.assigned_date,
+        expiry_date=plan.expiry_date,
+        branch_name=plan.branch_name,
+        user=user_response(plan.user, plan.user_id),
+        assigned_by_trainer=trainer_response(plan.assigned_by_trainer, plan.assigned_by_trainer_id, trainer_name, trainer_branch),
+    )
+
+
+def list_plans(
+    db: Session,
+    model: PlanModel,
+    *criteria,
+    cursor: Optional[str] = None,
+    limit: int = PLANS_DEFAULT_LIMIT,
+    member_required: bool = False,
+):
+    """
+    Plans matching criteria, newest first, keyset-paged on id: returns up to limit + 1
+    rows for plans_page. The member and trainer are joined into the same query instead
+    of loaded per plan; member_required drops plans whose member no longer exists.
+    """
+    query = db.query(model).options(joinedload(model.assigned_by_trainer))
+    if member_required:
+        query = query.join(model.user).options(contains_eager(model.user))
+    else:
+        query = query.options(joinedload(model.user))
+    if cursor:
+        (plan_id,) = pagination.decode_cursor(cursor, int)
+        query = query.filter(model.id < plan_id)
+    return query.filter(*criteria).order_by(model.id.desc()).limit(limit + 1).all()
+
+
+def plans_page(response: Response, rows, limit: int):
+    """Trims list_plans' extra row and sets X-Next-Cursor when there is another page."""
+    page = rows[:limit]
+    if len(rows) > limit:
+        pagination.set_cursor_header(response, pagination.NEXT_CURSOR_HEADER, pagination.encode_cursor(page[-1].id))
+    return page
@@ -0,0 +1,231 @@
+# backend/reminders.py
+"""
+Scheduled fee-due and plan-expiry reminders.
+
+Walks unpaid fees due within REMINDER_DUE_SOON_DAYS (and overdue ones) in keyset
+chunks, then bulk inserts one UserNotification per reminder and queues fee emails
+in the outbox. Each (kind, target, stage) is recorded in reminders_sent, so the
+job can run as often as needed and never sends the same reminder twice.
+
+    python -m app.reminders                 # remind as of today
+    python -m app.reminders --today 2026-01-31 --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import database, email_outbox, email_templates, models
+
+REMINDER_DUE_SOON_DAYS = int(os.getenv("REMINDER_DUE_SOON_DAYS", 3))
+# Fees overdue for longer than this are left alone, so the first run does not
+# dig up years of stale assignments
+REMINDER_OVERDUE_MAX_DAYS = int(os.getenv("REMINDER_OVERDUE_MAX_DAYS", 30))
+REMINDER_PLAN_EXPIRY_DAYS = int(os.getenv("REMINDER_PLAN_EXPIRY_DAYS", 3))
+REMINDER_CHUNK_SIZE = int(os.getenv("REMINDER_CHUNK_SIZE", 5000))
+REMINDER_SEND_EMAILS = os.getenv("REMINDER_SEND_EMAILS", "true").lower() == "true"
+
+DUE_SOON = "due_soon"
+DUE_TODAY = "due_today"
+OVERDUE = "overdue"
+EXPIRING = "expiring"
+
+
+def fee_stage(due_date: date, today: date) -> str:
+    if due_date < today:
+        return OVERDUE
+    if due_date == today:
+        return DUE_TODAY
+    return DUE_SOON
+
+
+def claim_reminders(db: Session, kind: str, candidates: List[Tuple[int, str]]) -> set:
+    """
+    Records (target_id, stage) pairs in reminders_sent and returns the ones that were
+    not recorded before. The unique constraint makes concurrent runs safe as well.
+    """
+    if not candidates:
+        return set()
+    rows = [{"kind": kind, "target_id": target_id, "stage": stage} for target_id, stage in candidates]
+    table = models.ReminderSent.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table).on_conflict_do_nothing(
+            index_elements=["kind", "target_id", "stage"]
+        ).returning(table.c.target_id, table.c.stage)
+        return {tuple(r) for r in db.execute(stmt, rows)}
+
+    target_ids = [target_id for target_id, _ in candidates]
+    existing = {
+        tuple(r) for r in db.execute(
+            select(table.c.target_id, table.c.stage).where(
+                table.c.kind == kind, table.c.target_id.in_(target_ids)
+            )
+        )
+    }
+    new_rows = [r for r in rows if (r["target_id"], r["stage"]) not in existing]
+    if new_rows:
+        db.execute(insert(table), new_rows)
+    return {(r["target_id"], r["stage"]) for r in new_rows}
+
+
+def fee_message(row, stage: str, today: date) -> str:
+    if stage == OVERDUE:
+        return f"Your fee of ₹{row.amount} for '{row.fee_type}' was due on {row.due_date} and is overdue."
+    if stage == DUE_TODAY:
+        return f"Your fee of ₹{row.amount} for '{row.fee_type}' is due today."
+    days_left = (row.due_date - today).days
+    return f"Your fee of ₹{row.amount} for '{row.fee_type}' is due on {row.due_date} ({days_left} day{'s' if days_left != 1 else ''} left)."
+
+
+def remind_fees(db: Session, today: date, dry_run: bool = False) -> Dict[str, int]:
+    fee = models.FeeAssignment
+    user = models.User
+    counts = {DUE_SOON: 0, DUE_TODAY: 0, OVERDUE: 0, "emails": 0, "scanned": 0}
+
+    base = select(
+        fee.id, fee.user_id, fee.fee_type, fee.amount, fee.due_date, user.name, user.email
+    ).join(user, user.id == fee.user_id).where(
+        fee.is_paid == False,
+        fee.due_date >= today - timedelta(days=REMINDER_OVERDUE_MAX_DAYS),
+        fee.due_date <= today + timedelta(days=REMINDER_DUE_SOON_DAYS),
+    ).order_by(fee.due_date, fee.id).limit(REMINDER_CHUNK_SIZE)
+
+    last: Optional[Tuple[date, int]] = None
+    while True:
+        stmt = base
+        if last is not None:
+            stmt = stmt.where(or_(fee.due_date > last[0], and_(fee.due_date == last[0], fee.id > last[1])))
+        rows = db.execute(stmt).all()
+        if not rows:
+            break
+        last = (rows[-1].due_date, rows[-1].id)
+        counts["scanned"] += len(rows)
+
+        stages = {row.id: fee_stage(row.due_date, today) for row in rows}
+        if dry_run:
+            for stage in stages.values():
+                counts[stage] += 1
+            continue
+
+        claimed = claim_reminders(db, "fee", list(stages.items()))
+        due = [row for row in rows if (row.id, stages[row.id]) in claimed]
+
+        if due:
+            db.execute(insert(models.UserNotification), [
+                {
+                    "user_id": row.user_id,
+                    "message": fee_message(row, stages[row.id], today),
+                    "notification_type": f"fee_{stages[row.id]}",
+                    "is_read": False,
+                }
+                for row in due
+            ])
+            if REMINDER_SEND_EMAILS:
+                counts["emails"] += email_outbox.enqueue_template(db, email_templates.FEE_REMINDER, [
+                    (
+                        row.email,
+                        f"Fee {'Overdue' if stages[row.id] == OVERDUE else 'Reminder'} - {row.fee_type}",
+                        {
+                            "name": row.name,
+                            "fee_type": row.fee_type,
+                            "amount": row.amount,
+                            "due_date": row.due_date,
+                            "days_left": (row.due_date - today).days,
+                            "overdue": stages[row.id] == OVERDUE,
+                        },
+                    )
+                    for row in due if row.email
+                ])
+            for row in due:
+                counts[stages[row.id]] += 1
+
+        # Commit per chunk: progress is kept if the job dies, and locks stay short
+        db.commit()
+
+        if len(rows) < REMINDER_CHUNK_SIZE:
+            break
+
+    return counts
+
+
+def remind_plans(db: Session, today: date, dry_run: bool = False) -> Dict[str, int]:
+    """In-app notifications for diet and exercise plans expiring within REMINDER_PLAN_EXPIRY_DAYS."""
+    counts = {}
+    for kind, plan, label in (
+        ("diet_plan", models.DietPlan, "diet plan"),
+        ("exercise_plan", models.ExercisePlan, "exercise plan"),
+    ):
+        counts[kind] = 0
+        base = select(plan.id, plan.user_id, plan.title, plan.expiry_date).where(
+            plan.expiry_date >= today,
+            plan.expiry_date <= today + timedelta(days=REMINDER_PLAN_EXPIRY_DAYS),
+        ).order_by(plan.id).limit(REMINDER_CHUNK_SIZE)
+
+        last_id = 0
+        while True:
+            rows = db.execute(base.where(plan.id > last_id)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            if dry_run:
+                counts[kind] += len(rows)
+            else:
+                claimed = claim_reminders(db, kind, [(row.id, EXPIRING) for row in rows])
+                due = [row for row in rows if (row.id, EXPIRING) in claimed]
+                if due:
+                    db.execute(insert(models.UserNotification), [
+                        {
+                            "user_id": row.user_id,
+                            "message": f"Your {label} '{row.title}' expires on {row.expiry_date}.",
+                            "notification_type": f"{kind}_expiring",
+                            "is_read": False,
+                        }
+                        for row in due
+                    ])
+                db.commit()
+                counts[kind] += len(due)
+
+            if len(rows) < REMINDER_CHUNK_SIZE:
+                break
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send fee-due and plan-expiry reminders.")
+    parser.add_argument("--today", type=date.fromisoformat, default=None, help="Run as of this date (YYYY-MM-DD)")
+    parser.add_argument("--dry-run", action="store_true", help="Count reminders without recording or sending them")
+    parser.add_argument("--skip-plans", action="store_true", help="Only send fee reminders")
+    args = parser.parse_args(argv)
+
+    today = args.today or date.today()
+    started = time.perf_counter()
+    db = database.SessionLocal()
+    try:
+        fee_counts = remind_fees(db, today, dry_run=args.dry_run)
+        print(
+            f"Fees: scanned {fee_counts['scanned']}, due soon {fee_counts[DUE_SOON]}, "
+            f"due today {fee_counts[DUE_TODAY]}, overdue {fee_counts[OVERDUE]}, emails queued {fee_counts['emails']}"
+        )
+        if not args.skip_plans:
+            plan_counts = remind_plans(db, today, dry_run=args.dry_run)
+            print(f"Plans expiring: diet {plan_counts['diet_plan']}, exercise {plan_counts['exercise_plan']}")
+    finally:
+        db.close()
+
+    print(f"{'Dry run' if args.dry_run else 'Reminders'} finished in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# backend/revenue.py
+# Monthly revenue rollup shared by /fees/monthly-revenue and the Excel export. Months
+# are bucketed, filtered and summed in SQL, so neither endpoint loads payments into Python.
+import re
+from collections import namedtuple
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Display names for payment types whose spelling varies between the admin screens
+# ("UPI") and the Razorpay verification ("Upi")
+PAYMENT_TYPE_LABELS = {"card": "Card", "cash": "Cash", "upi": "UPI", "cheque": "Cheque"}
+
+# Columns a rollup can additionally be split by
+REVENUE_SPLITS = ("branch", "payment_type")
+
+RevenueRow = namedtuple("RevenueRow", ["month", "total", "branch", "payment_type"])
+
+_MONTH = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+def payment_type_label(payment_type: Optional[str]) -> str:
+    method = (payment_type or "").lower()
+    return PAYMENT_TYPE_LABELS.get(method, method.capitalize() or "Unspecified")
+
+
+def parse_month(value: str, field: str) -> Tuple[int, int]:
+    match = _MONTH.match(value)
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{field} must be in YYYY-MM format.",
+        )
+    return int(match.group(1)), int(match.group(2))
+
+
+def month_start(year: int, month: int) -> datetime:
+    return datetime(year, month, 1)
+
+
+def next_month_start(year: int, month: int) -> datetime:
+    return datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+
+
+def month_bucket(db: Session, column):
+    """YYYY-MM of a timestamp column, computed by the database."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(func.date_trunc("month", column), "YYYY-MM")
+
+
+def _has_receipts(db: Session) -> bool:
+    return db.execute(
+        select(models.FeeReceipt.id).where(models.FeeReceipt.payment_date.isnot(None)).limit(1)
+    ).first() is not None
+
+
+def monthly_revenue(
+    db: Session,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    split_by: Sequence[str] = (),
+) -> List[RevenueRow]:
+    """
+    Revenue per month, newest first, optionally also per branch and/or payment type.
+
+    Totals come from fee receipts by payment_date; until any receipt exists, paid fee
+    assignments are counted by their last update instead. start_month and end_month
+    are inclusive YYYY-MM bounds.
+    """
+    for split in split_by:
+        if split not in REVENUE_SPLITS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot split revenue by {split!r}; use one of {', '.join(REVENUE_SPLITS)}.",
+            )
+
+    if _has_receipts(db):
+        paid_at = models.FeeReceipt.payment_date
+        amount = models.FeeReceipt.amount
+        payment_type = models.FeeReceipt.payment_type
+        query = select().select_from(models.FeeReceipt).where(paid_at.isnot(None))
+        if "branch" in split_by:
+            query = query.join(models.FeeAssignment, models.FeeAssignment.id == models.FeeReceipt.fee_assignment_id)
+    else:
+        paid_at = func.coalesce(models.FeeAssignment.updated_at, models.FeeAssignment.created_at)
+        amount = models.FeeAssignment.amount
+        payment_type = models.FeeAssignment.payment_type
+        query = select().select_from(models.FeeAssignment).where(
+            models.FeeAssignment.is_paid == True, paid_at.isnot(None)
+        )
+
+    if start_month:
+        query = query.where(paid_at >= month_start(*parse_month(start_month, "start_month")))
+    if end_month:
+        query = query.where(paid_at < next_month_start(*parse_month(end_month, "end_month")))
+
+    month = month_bucket(db, paid_at).label("month")
+    groups = [month]
+    if "branch" in split_by:
+        groups.append(models.FeeAssignment.branch_name.label("branch"))
+    if "payment_type" in split_by:
+        groups.append(func.lower(func.coalesce(payment_type, "")).label("payment_type"))
+
+    query = (
+        query.add_columns(*groups, func.sum(amount).label("total"))
+        .group_by(*groups)
+        .order_by(month.desc(), *groups[1:])
+    )
+
+    return [
+        RevenueRow(
+            month=row.month,
+            total=float(row.total or 0.0),
+            branch=row.branch if "branch" in split_by else None,
+            payment_type=payment_type_label(row.payment_type) if "payment_type" in split_by else None,
+        )
+        for row in db.execute(query)
+    ]
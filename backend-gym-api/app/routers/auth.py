@@ -1,59 +1,51 @@
 # backend/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from .. import models, schemas, database, utils
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, database, utils, crud, passwords
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/login", response_model=schemas.Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_async_db)
 ):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if user and utils.verify_password(form_data.password, user.password):
-        if not user.is_verified:
+    # Users take precedence over trainers sharing the same email, as before
+    identities = (await db.execute(crud.identity_lookup(form_data.username))).all()
+    for identity in identities:
+        # bcrypt runs on the password executor, so the event loop and request threadpool stay free
+        valid, new_hash = await passwords.verify_and_update_async(form_data.password, identity.password)
+        if not valid:
+            continue
+
+        if new_hash:
+            # Stored hash was made with a different BCRYPT_ROUNDS; upgrade it transparently
+            await db.execute(crud.password_update(identity.kind, identity.id, new_hash))
+            await db.commit()
+
+        if not identity.is_verified:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Email not verified. Please check your inbox for a verification link.",
             )
-        
-        access_token_expires = utils.timedelta(minutes=utils.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = utils.create_access_token(
-            data={"sub": user.email, "role": user.role, "branch": user.branch, "id": user.id},
-            expires_delta=access_token_expires,
-        )
-        return {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "user_data": schemas.UserResponse(
-                id=user.id,
-                name=user.name,
-                email=user.email,
-                phone=user.phone,
-                role=user.role,
-                branch=user.branch
-            ),
-        }
 
-    trainer = db.query(models.Trainer).filter(models.Trainer.email == form_data.username).first()
-    if trainer and utils.verify_password(form_data.password, trainer.password):
+        user_data = schemas.UserResponse(
+            id=identity.id,
+            name=identity.name,
+            email=identity.email,
+            phone=identity.phone,
+            role=identity.role,
+            branch=identity.branch
+        )
         access_token_expires = utils.timedelta(minutes=utils.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = utils.create_access_token(
-            data={"sub": trainer.email, "role": "trainer", "branch": trainer.branch_name, "id": trainer.id},
+            data=utils.access_token_claims(user_data),
             expires_delta=access_token_expires,
         )
         return {
             "access_token": access_token,
             "token_type": "bearer",
-            "user_data": schemas.UserResponse(
-                id=trainer.id,
-                name=trainer.name,
-                email=trainer.email,
-                phone=trainer.phone,
-                role="trainer",
-                branch=trainer.branch_name
-            ),
+            "user_data": user_data,
         }
 
     raise HTTPException(
@@ -63,7 +55,7 @@ def login_for_access_token(
     )
 
 @router.get("/me", response_model=schemas.UserResponse)
-def read_users_me(
-    current_user: schemas.UserResponse = Depends(utils.get_current_user),
+async def read_users_me(
+    current_user: schemas.UserResponse = Depends(utils.get_current_user_async),
 ):
     return current_user
\ No newline at end of file
@@ -2,12 +2,15 @@
 # ⭐️ I've updated this file ⭐️
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status, Form # ✅ Added Form
 from sqlalchemy.orm import Session
-from .. import database, models, utils
+from sqlalchemy import func, distinct, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import attendance, database, face_client, face_engine, models, schemas, utils
+from ..admission import face_pipeline
+from ..face_gallery import tolerance_for
 from datetime import date, datetime # Import both date and datetime class
 import datetime # Keep this if other parts of the codebase might rely on it, but is potentially redundant now.
-import face_recognition
 import numpy as np
-import io
 from PIL import Image
 import logging
 from typing import List
@@ -36,12 +39,22 @@ def get_current_trainer(current_user = Depends(get_current_active_user)):
         )
     return current_user
 
-@router.post("/")
+async def get_current_trainer_with_face_slot(current_user = Depends(get_current_trainer)):
+    # Holds a face pipeline slot for the rest of the request, taken only once the caller
+    # is authenticated so anonymous requests cannot occupy or queue for slots
+    async with face_pipeline.slot():
+        yield current_user
+
+def get_current_trainer_async(current_user = Depends(utils.get_current_user_async)):
+    # Async-session variant of get_current_trainer for endpoints on the async engine
+    return get_current_trainer(current_user)
+
+@router.post("/", dependencies=[Depends(face_engine.require_face_recognition)])
 async def mark_attendance_from_face(
     file: UploadFile = File(...),
     active_members_only: bool = Form(False), # ✅ NEW: Accept toggle state from frontend
     db: Session = Depends(database.get_db),
-    current_user = Depends(get_current_trainer)
+    current_user = Depends(get_current_trainer_with_face_slot)
 ):
     try:
         # Validate file type
@@ -63,36 +76,31 @@ async def mark_attendance_from_face(
 
         logger.info(f"Processing face attendance request. Active members only: {active_members_only}")
 
+        # Trainers and admins only match members of their own branch; superadmins search
+        # every branch, home branch first. With FACE_WORKER_MODE=socket this runs in the face worker.
+        search_branch = current_user.branch if current_user.role in ["trainer", "admin"] and current_user.branch else None
         try:
-            # Use Pillow to open and convert the image to 8-bit RGB
-            img = Image.open(io.BytesIO(contents)).convert("RGB")
-            # Convert the Pillow image to a NumPy array for face_recognition
-            img_np = np.array(img)
-            logger.info(f"Image loaded successfully. Shape: {img_np.shape}")
-        except Exception as e:
+            recognition = await face_client.recognize(
+                db,
+                contents,
+                branch=search_branch,
+                home_branch=current_user.branch,
+                active_only=active_members_only,
+            )
+        except face_client.FaceImageError as e:
             logger.error(f"Error loading image: {e}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid or unreadable image file: {e}"
             )
+        except face_client.FaceProcessingError as e:
+            logger.error(f"Error processing faces in image: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error processing faces in image: {str(e)}"
+            )
 
-        # Query users with face encodings based on user permissions
-        query = db.query(models.User).filter(models.User.face_encoding.isnot(None))
-        
-        # ✅ NEW LOGIC: Filter for active members if toggled
-        if active_members_only:
-            logger.info("Filtering for active (paid) members only.")
-            query = query.join(
-                models.FeeAssignment, models.User.id == models.FeeAssignment.user_id
-            ).filter(models.FeeAssignment.is_paid == True)
-        
-        # Filter by branch for trainers and admins
-        if current_user.role in ["trainer", "admin"] and current_user.branch:
-            query = query.filter(models.User.branch == current_user.branch)
-        
-        users = query.distinct(models.User.id).all() # Use distinct to avoid duplicates
-
-        if not users:
+        if not recognition.gallery_size:
             detail_message = "No users with face encodings found in your branch."
             if active_members_only:
                 detail_message = "No active (paid) members with face encodings found in your branch."
@@ -101,52 +109,15 @@ async def mark_attendance_from_face(
                 detail=detail_message
             )
 
-        logger.info(f"Found {len(users)} users with face encodings to compare against.")
-
-        # Prepare known face data
-        known_encodings = []
-        known_ids = []
-        known_names = {}
-        known_branches = {}
-        
-        for user in users:
-            try:
-                encoding = np.frombuffer(user.face_encoding, dtype=np.float64)
-                known_encodings.append(encoding)
-                known_ids.append(user.id)
-                known_names[user.id] = user.name
-                known_branches[user.id] = user.branch
-            except Exception as e:
-                logger.warning(f"Error loading face encoding for user {user.id}: {e}")
-                continue
-
-        if not known_encodings:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No valid face encodings found."
-            )
-
-        # Find faces in the uploaded image
-        try:
-            face_locations = face_recognition.face_locations(img_np, model="hog")
-            face_encodings_in_image = face_recognition.face_encodings(img_np, face_locations)
-            logger.info(f"Found {len(face_encodings_in_image)} faces in the uploaded image")
-        except Exception as e:
-            logger.error(f"Error processing faces in image: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error processing faces in image: {str(e)}"
-            )
+        logger.info(f"Compared against {recognition.gallery_size} enrolled faces; found {len(recognition.matches)} faces in the uploaded image")
 
-        if not face_encodings_in_image:
+        if not recognition.matches:
             return {
                 "message": "No faces detected in the image.", 
                 "present_user_ids": [],
                 "recognized_users": []
             }
 
-        marked_users = []
-        recognized_users = []
         today = date.today()
         # FIX: Use the datetime class from the datetime module
         now = datetime.datetime.now() 
@@ -154,81 +125,34 @@ async def mark_attendance_from_face(
         current_time = now.time()
 
         
-        for unknown_encoding in face_encodings_in_image:
-            try:
-                # Compare the unknown face with known faces
-                matches = face_recognition.compare_faces(
-                    known_encodings, 
-                    unknown_encoding, 
-                    tolerance=0.5
-                )
-                
-                # Calculate face distances to find the best match
-                face_distances = face_recognition.face_distance(known_encodings, unknown_encoding)
-                
-                # Find the best match (smallest distance)
-                if len(face_distances) > 0:
-                    best_match_index = np.argmin(face_distances)
-                    
-                    # Check if it's a good match (distance < 0.5 and matches[best_match_index] is True)
-                    if matches[best_match_index] and face_distances[best_match_index] < 0.5:
-                        matched_id = known_ids[best_match_index]
-                        matched_name = known_names[matched_id]
-                        user_branch = known_branches[matched_id]
-                        
-                        logger.info(f"Face matched: User {matched_id} ({matched_name}) with distance {face_distances[best_match_index]:.3f}")
-                        
-                        # Check if attendance is already marked for today
-                        existing_attendance = db.query(models.UserAttendance).filter(
-                            models.UserAttendance.user_id == matched_id,
-                            models.UserAttendance.date == today_date
-                        ).first()
-
-                        if existing_attendance:
-                            logger.info(f"Attendance already marked for user {matched_id} on {today}")
-                            recognized_users.append({
-                                "user_id": matched_id,
-                                "name": matched_name,
-                                "status": "already_marked",
-                                "existing_status": existing_attendance.status
-                            })
-                        else:
-                            # Mark new attendance
-                            try:
-                                new_attendance = models.UserAttendance(
-                                    user_id=matched_id,
-                                    date=today_date, # 検 Use today_date
-                                    time=current_time,
-                                    status="present",
-                                    branch=user_branch
-                                )
-                                db.add(new_attendance)
-                                marked_users.append(matched_id)
-                                recognized_users.append({
-                                    "user_id": matched_id,
-                                    "name": matched_name,
-                                    "status": "marked_present",
-                                    "date": today_date.isoformat(),
-                                    "time": current_time.isoformat()
-                                })
-                                logger.info(f"Marked attendance for user {matched_id} ({matched_name})")
-                            except Exception as e:
-                                logger.error(f"Error marking attendance for user {matched_id}: {e}")
-                                continue
-                    else:
-                        logger.info(f"Face not recognized well enough. Best distance: {face_distances[best_match_index]:.3f}")
-                        
-            except Exception as e:
-                logger.error(f"Error processing face encoding: {e}")
-                continue
-        
-        # Commit all attendance records
+        # Best match per recognized user; the same person appearing twice counts once
+        matched = {}
+        for match in recognition.matches:
+            if match:
+                # Check if it's a good match for the matched user's branch
+                if match.distance < tolerance_for(match.branch):
+                    logger.info(f"Face matched: User {match.user_id} ({match.name}) with distance {match.distance:.3f}")
+                    if match.user_id not in matched or match.distance < matched[match.user_id].distance:
+                        matched[match.user_id] = match
+                else:
+                    logger.info(f"Face not recognized well enough. Best distance: {match.distance:.3f}")
+
+        # One insert for every match; rows already marked today are left untouched, and
+        # the unique (user_id, date) constraint keeps concurrent kiosks from double marking
         try:
-            if marked_users:
-                db.commit()
-                logger.info(f"Successfully committed attendance for {len(marked_users)} users")
-            else:
-                logger.info("No new attendance records to commit")
+            inserted = attendance.upsert_attendance(db, [
+                {
+                    "user_id": m.user_id,
+                    "date": today_date, # 検 Use today_date
+                    "time": current_time,
+                    "status": "present",
+                    "branch": m.branch,
+                }
+                for m in matched.values()
+            ], update_existing=False)
+            db.commit()
+        except database.PoolTimeoutError:
+            raise
         except Exception as e:
             logger.error(f"Error committing attendance records: {e}")
             db.rollback()
@@ -237,6 +161,36 @@ async def mark_attendance_from_face(
                 detail="Error saving attendance records to database"
             )
 
+        already_marked_ids = [uid for uid in matched if (uid, today_date) not in inserted]
+        existing_status = dict(db.execute(
+            select(models.UserAttendance.user_id, models.UserAttendance.status).where(
+                models.UserAttendance.user_id.in_(already_marked_ids),
+                models.UserAttendance.date == today_date
+            )
+        ).all()) if already_marked_ids else {}
+
+        marked_users = []
+        recognized_users = []
+        for m in matched.values():
+            if (m.user_id, today_date) in inserted:
+                marked_users.append(m.user_id)
+                recognized_users.append({
+                    "user_id": m.user_id,
+                    "name": m.name,
+                    "status": "marked_present",
+                    "date": today_date.isoformat(),
+                    "time": current_time.isoformat()
+                })
+                logger.info(f"Marked attendance for user {m.user_id} ({m.name})")
+            else:
+                logger.info(f"Attendance already marked for user {m.user_id} on {today}")
+                recognized_users.append({
+                    "user_id": m.user_id,
+                    "name": m.name,
+                    "status": "already_marked",
+                    "existing_status": existing_status.get(m.user_id)
+                })
+
         # Prepare response message
         if marked_users:
             message = f"Attendance marked successfully for {len(marked_users)} user(s)."
@@ -253,13 +207,13 @@ async def mark_attendance_from_face(
             "message": message,
             "present_user_ids": marked_users,
             "recognized_users": recognized_users,
-            "total_faces_detected": len(face_encodings_in_image),
+            "total_faces_detected": len(recognition.matches),
             "date": today_date.isoformat(),
             "time": current_time.isoformat()
         }
 
-    except HTTPException:
-        # Re-raise HTTP exceptions
+    except (HTTPException, database.PoolTimeoutError):
+        # Re-raise HTTP exceptions, and pool timeouts for the 503 handler
         raise
     except Exception as e:
         # Catch any other unexpected errors
@@ -272,50 +226,83 @@ async def mark_attendance_from_face(
 
 @router.get("/attendance-stats")
 async def get_attendance_stats(
-    db: Session = Depends(database.get_db),
-    current_user = Depends(get_current_trainer),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user = Depends(get_current_trainer_async),
     start_date: date = None,
-    end_date: date = None
+    end_date: date = None,
+    per_day: bool = False
 ):
-    """Get attendance statistics for the branch"""
+    """Get attendance statistics for the branch, aggregated in the database"""
     try:
-        query = db.query(models.UserAttendance)
-        
+        present = models.UserAttendance.status == "present"
+        absent = models.UserAttendance.status == "absent"
+
+        filters = []
+
         # Filter by branch for trainers and admins
         if current_user.role in ["trainer", "admin"] and current_user.branch:
-            query = query.filter(models.UserAttendance.branch == current_user.branch)
-        
+            filters.append(models.UserAttendance.branch == current_user.branch)
+
         # Apply date filters
         if start_date:
-            query = query.filter(models.UserAttendance.date >= start_date)
+            filters.append(models.UserAttendance.date >= start_date)
         if end_date:
-            query = query.filter(models.UserAttendance.date <= end_date)
+            filters.append(models.UserAttendance.date <= end_date)
         else:
             # Default to today if no end date specified
-            query = query.filter(models.UserAttendance.date == date.today())
-        
-        attendance_records = query.all()
-        
-        # Calculate statistics
-        total_records = len(attendance_records)
-        present_count = len([r for r in attendance_records if r.status == "present"])
-        absent_count = len([r for r in attendance_records if r.status == "absent"])
-        
-        # Get unique users count
-        unique_users = len(set([r.user_id for r in attendance_records]))
-        
-        return {
+            filters.append(models.UserAttendance.date == date.today())
+
+        # One aggregate row regardless of how many records the range covers
+        totals = (await db.execute(
+            select(
+                func.count(models.UserAttendance.id).label("total_records"),
+                func.count(models.UserAttendance.id).filter(present).label("present_count"),
+                func.count(models.UserAttendance.id).filter(absent).label("absent_count"),
+                func.count(distinct(models.UserAttendance.user_id)).label("unique_users"),
+            ).where(*filters)
+        )).one()
+
+        total_records = totals.total_records or 0
+        present_count = totals.present_count or 0
+
+        stats = {
             "total_records": total_records,
             "present_count": present_count,
-            "absent_count": absent_count,
-            "unique_users": unique_users,
+            "absent_count": totals.absent_count or 0,
+            "unique_users": totals.unique_users or 0,
             "attendance_rate": round((present_count / total_records * 100) if total_records > 0 else 0, 2),
             "date_range": {
                 "start": start_date.isoformat() if start_date else date.today().isoformat(),
                 "end": end_date.isoformat() if end_date else date.today().isoformat()
             }
         }
+
+        if per_day:
+            daily_rows = (await db.execute(
+                select(
+                    models.UserAttendance.date,
+                    func.count(models.UserAttendance.id).label("total_records"),
+                    func.count(models.UserAttendance.id).filter(present).label("present_count"),
+                    func.count(models.UserAttendance.id).filter(absent).label("absent_count"),
+                    func.count(distinct(models.UserAttendance.user_id)).label("unique_users"),
+                ).where(*filters).group_by(models.UserAttendance.date).order_by(models.UserAttendance.date)
+            )).all()
+
+            stats["daily"] = [
+                {
+                    "date": row.date.isoformat(),
+                    "total_records": row.total_records,
+                    "present_count": row.present_count,
+                    "absent_count": row.absent_count,
+                    "unique_users": row.unique_users,
+                }
+                for row in daily_rows
+            ]
+
+        return stats
         
+    except (HTTPException, database.PoolTimeoutError):
+        raise
     except Exception as e:
         logger.error(f"Error getting attendance stats: {e}")
         raise HTTPException(
@@ -325,7 +312,7 @@ async def get_attendance_stats(
 
 
 @router.post("/manual-attendance")
-async def mark_manual_attendance(
+def mark_manual_attendance(
     user_ids: List[int],
     attendance_date: date = None,
     db: Session = Depends(database.get_db),
@@ -333,55 +320,55 @@ async def mark_manual_attendance(
 ):
     """Manually mark attendance for multiple users"""
     try:
-        now = datetime.now() # 検 Get current datetime
+        now = datetime.datetime.now() # 検 Get current datetime
         if not attendance_date:
             attendance_date = now.date()
-        current_time = now.time() # 検 Get current time
-        
+        current_time = now.time() # 検 Get current time
+
+        # Request order, without duplicates
+        requested_ids = list(dict.fromkeys(user_ids))
+
         # Verify all users exist and are in the correct branch
-        query = db.query(models.User).filter(models.User.id.in_(user_ids))
-        
+        query = select(models.User.id, models.User.branch).where(models.User.id.in_(requested_ids))
+
         if current_user.role in ["trainer", "admin"] and current_user.branch:
-            query = query.filter(models.User.branch == current_user.branch)
-        
-        users = query.all()
-        found_user_ids = [u.id for u in users]
-        missing_user_ids = [uid for uid in user_ids if uid not in found_user_ids]
-        
+            query = query.where(models.User.branch == current_user.branch)
+
+        user_branches = dict(db.execute(query).all())
+        missing_user_ids = [uid for uid in requested_ids if uid not in user_branches]
+
         if missing_user_ids:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Users not found or not in your branch: {missing_user_ids}"
             )
-        
-        marked_users = []
-        updated_users = []
-        
-        for user in users:
-            # Check if attendance already exists
-            existing = db.query(models.UserAttendance).filter(
-                models.UserAttendance.user_id == user.id,
+
+        # One query for every existing record on that date
+        existing_status = dict(db.execute(
+            select(models.UserAttendance.user_id, models.UserAttendance.status).where(
+                models.UserAttendance.user_id.in_(requested_ids),
                 models.UserAttendance.date == attendance_date
-            ).first()
-            
-            if existing:
-                if existing.status != "present":
-                    existing.status = "present"
-                    existing.time = current_time,
-                    time=current_time,
-                    updated_users.append(user.id)
-            else:
-                new_attendance = models.UserAttendance(
-                    user_id=user.id,
-                    date=attendance_date,
-                    status="present",
-                    branch=user.branch
-                )
-                db.add(new_attendance)
-                marked_users.append(user.id)
-        
+            )
+        ).all())
+
+        marked_users = [uid for uid in requested_ids if uid not in existing_status]
+        updated_users = [
+            uid for uid in requested_ids
+            if uid in existing_status and existing_status[uid] != "present"
+        ]
+
+        attendance.upsert_attendance(db, [
+            {
+                "user_id": uid,
+                "date": attendance_date,
+                "time": current_time,
+                "status": "present",
+                "branch": user_branches[uid],
+            }
+            for uid in marked_users + updated_users
+        ])
         db.commit()
-        
+
         return {
             "message": f"Attendance processed for {len(user_ids)} users",
             "marked_new": marked_users,
@@ -389,8 +376,8 @@ async def mark_manual_attendance(
             "date": attendance_date.isoformat(),
             "time": current_time.isoformat()
         }
-        
-    except HTTPException:
+
+    except (HTTPException, database.PoolTimeoutError):
         raise
     except Exception as e:
         logger.error(f"Error in manual attendance: {e}")
@@ -401,7 +388,142 @@ async def mark_manual_attendance(
         )
         
 
-@router.post("/face-attendance")
+MAX_SYNC_BATCH_SIZE = 500
+
+
+@router.post("/sync", response_model=schemas.KioskSyncResponse)
+def sync_kiosk_attendance(
+    batch: schemas.KioskSyncRequest,
+    db: Session = Depends(database.get_db),
+    current_user = Depends(get_current_trainer)
+):
+    """
+    Accepts attendance events recorded by a kiosk while it was offline.
+    Events are deduplicated on their event_uuid and on (user_id, date), and the
+    whole batch is written in a single transaction.
+    """
+    events = batch.events
+    if len(events) > MAX_SYNC_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A sync batch may contain at most {MAX_SYNC_BATCH_SIZE} events."
+        )
+    if not events:
+        return schemas.KioskSyncResponse(marked=0, already_marked=0, duplicates=0, rejected=0, results=[])
+
+    event_uuids = {str(e.event_uuid) for e in events}
+    user_ids = {e.user_id for e in events}
+
+    # Kiosk clocks may send timezone-aware timestamps; attendance is stored in server local time
+    local_times = {
+        str(e.event_uuid): e.timestamp.astimezone().replace(tzinfo=None) if e.timestamp.tzinfo else e.timestamp
+        for e in events
+    }
+
+    try:
+        # Three lookups for the whole batch instead of several per event
+        seen_uuids = set(db.execute(
+            select(models.KioskAttendanceEvent.event_uuid)
+            .where(models.KioskAttendanceEvent.event_uuid.in_(event_uuids))
+        ).scalars().all())
+
+        user_stmt = select(models.User.id, models.User.branch).where(models.User.id.in_(user_ids))
+        if current_user.role in ["trainer", "admin"] and current_user.branch:
+            user_stmt = user_stmt.where(models.User.branch == current_user.branch)
+        user_branches = {row.id: row.branch for row in db.execute(user_stmt)}
+
+        marked_days = attendance.existing_attendance_keys(
+            db, [(e.user_id, local_times[str(e.event_uuid)].date()) for e in events if e.user_id in user_branches]
+        )
+
+        outcomes = []
+        new_marks = []
+        for event in events:
+            event_uuid = str(event.event_uuid)
+            if event_uuid in seen_uuids:
+                outcome = "duplicate"
+            else:
+                seen_uuids.add(event_uuid)
+                event_time = local_times[event_uuid]
+                day = (event.user_id, event_time.date())
+
+                if event.user_id not in user_branches:
+                    outcome = "rejected"
+                elif day in marked_days:
+                    outcome = "already_marked"
+                else:
+                    marked_days.add(day)
+                    new_marks.append({
+                        "user_id": event.user_id,
+                        "date": event_time.date(),
+                        "time": event_time.time(),
+                        "status": "present",
+                        "branch": user_branches[event.user_id],
+                    })
+                    outcome = "marked"
+            outcomes.append(outcome)
+
+        # A face scan may have marked someone since the lookup; the upsert skips those rows
+        inserted = attendance.upsert_attendance(db, new_marks, update_existing=False)
+
+        results = []
+        counts = {"marked": 0, "already_marked": 0, "duplicate": 0, "rejected": 0}
+        ledger = []
+        for event, outcome in zip(events, outcomes):
+            event_uuid = str(event.event_uuid)
+            event_time = local_times[event_uuid]
+            if outcome == "marked" and (event.user_id, event_time.date()) not in inserted:
+                outcome = "already_marked"
+
+            if outcome in ("marked", "already_marked"):
+                ledger.append({
+                    "event_uuid": event_uuid,
+                    "kiosk_id": event.kiosk_id,
+                    "user_id": event.user_id,
+                    "event_time": event_time,
+                    "result": outcome,
+                })
+
+            counts[outcome] += 1
+            results.append(schemas.KioskSyncResult(event_uuid=event.event_uuid, status=outcome))
+
+        if ledger:
+            db.execute(insert(models.KioskAttendanceEvent), ledger)
+
+        db.commit()
+
+    except IntegrityError:
+        # Another request synced some of these events concurrently; the kiosk can safely retry
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Some events were synced concurrently. Please retry the batch."
+        )
+    except (HTTPException, database.PoolTimeoutError):
+        raise
+    except Exception as e:
+        logger.error(f"Error syncing kiosk attendance: {e}")
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error syncing kiosk attendance"
+        )
+
+    logger.info(
+        f"Kiosk sync processed {len(events)} events: {counts['marked']} marked, "
+        f"{counts['already_marked']} already marked, {counts['duplicate']} duplicates, {counts['rejected']} rejected"
+    )
+
+    return schemas.KioskSyncResponse(
+        marked=counts["marked"],
+        already_marked=counts["already_marked"],
+        duplicates=counts["duplicate"],
+        rejected=counts["rejected"],
+        results=results
+    )
+
+
+@router.post("/face-attendance", dependencies=[Depends(face_engine.require_face_recognition)])
 def mark_attendance(
     file: UploadFile = File(...),
     db: Session = Depends(database.get_db),
@@ -410,8 +532,8 @@ def mark_attendance(
     try:
         img = Image.open(BytesIO(file.file.read())).convert("RGB")
         img_np = np.array(img)
-        face_locations = face_recognition.face_locations(img_np)
-        face_encodings = face_recognition.face_encodings(img_np, face_locations)
+        face_locations = face_engine.face_locations(img_np)
+        face_encodings = face_engine.face_encodings(img_np, face_locations)
 
         if not face_encodings:
             raise HTTPException(status_code=400, detail="No face detected.")
@@ -423,7 +545,7 @@ def mark_attendance(
 
         for user in users:
             stored_encoding = np.frombuffer(user.face_encoding, dtype=np.float64)
-            match = face_recognition.compare_faces([stored_encoding], captured_encoding)[0]
+            match = face_engine.compare_faces([stored_encoding], captured_encoding)[0]
             if match:
                 # Record attendance
                 new_record = models.Attendance(
@@ -1,14 +1,11 @@
 # face_enrollment.py
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, status
 from sqlalchemy.orm import Session
-from PIL import Image
-import numpy as np
-import face_recognition
-import io
 import logging
 from sqlalchemy import select
 
-from .. import database, models, utils
+from .. import database, face_client, face_engine, models, utils
+from ..admission import face_pipeline
 
 router = APIRouter()
 
@@ -33,12 +30,18 @@ def get_current_trainer(current_user = Depends(get_current_active_user)):
         )
     return current_user
 
-@router.post("/face-enroll/{user_id}")
+async def get_current_trainer_with_face_slot(current_user = Depends(get_current_trainer)):
+    # Holds a face pipeline slot for the rest of the request, taken only once the caller
+    # is authenticated so anonymous requests cannot occupy or queue for slots
+    async with face_pipeline.slot():
+        yield current_user
+
+@router.post("/face-enroll/{user_id}", dependencies=[Depends(face_engine.require_face_recognition)])
 async def face_enroll(
     user_id: int, 
     file: UploadFile = File(...), 
     db: Session = Depends(database.get_db),
-    current_user = Depends(get_current_trainer)
+    current_user = Depends(get_current_trainer_with_face_slot)
 ):
     try:
         # Validate file type
@@ -60,67 +63,44 @@ async def face_enroll(
 
         logger.info(f"Processing face enrollment for user {user_id}")
 
-        # Use Pillow to load and explicitly convert the image to 8-bit RGB
+        # Detection runs off the event loop, or in the face worker with FACE_WORKER_MODE=socket
         try:
-            img = Image.open(io.BytesIO(contents)).convert("RGB")
-            logger.info(f"Image loaded successfully. Size: {img.size}")
-        except Exception as e:
+            found = await face_client.encode_face(contents)
+        except face_client.FaceImageError as e:
             logger.error(f"Error loading image: {e}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, 
                 detail=f"Invalid image file: {str(e)}"
             )
+        except face_client.FaceProcessingError as e:
+            logger.error(f"Error generating face encoding: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
+                detail=f"Error processing face: {str(e)}"
+            )
+        logger.info(f"Found {found.face_count} faces in the image")
         
-        # Convert the Pillow image to a NumPy array
-        img_np = np.array(img)
-        logger.info(f"Image converted to numpy array. Shape: {img_np.shape}")
-
-        # Find face locations
-        face_locations = face_recognition.face_locations(img_np, model="hog")
-        logger.info(f"Found {len(face_locations)} faces in the image")
-        
-        if len(face_locations) == 0:
+        if found.face_count == 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, 
                 detail="No faces detected in the image. Please ensure your face is clearly visible."
             )
         
-        if len(face_locations) > 1:
+        if found.face_count > 1:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, 
                 detail="Multiple faces detected. Please ensure only one face is visible in the image."
             )
 
-        # Generate face encoding
-        try:
-            face_encodings = face_recognition.face_encodings(img_np, face_locations)
-            if not face_encodings:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST, 
-                    detail="Could not generate face encoding. Please try with a clearer image."
-                )
-
-            face_encoding = face_encodings[0]
-
-            # Debug: Log type and dtype
-            logger.info(f"Face encoding type: {type(face_encoding)}, dtype: {getattr(face_encoding, 'dtype', None)}")
-
-            # Ensure it’s a NumPy array
-            if not isinstance(face_encoding, np.ndarray):
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Invalid face encoding format: {type(face_encoding)}"
-                )
-
-            logger.info(f"Face encoding generated successfully. Shape: {face_encoding.shape}")
-            
-        except Exception as e:
-            logger.error(f"Error generating face encoding: {e}")
+        if found.encoding is None:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-                detail=f"Error processing face: {str(e)}"
+                status_code=status.HTTP_400_BAD_REQUEST, 
+                detail="Could not generate face encoding. Please try with a clearer image."
             )
 
+        face_encoding = found.encoding
+        logger.info(f"Face encoding generated successfully. Shape: {face_encoding.shape}")
+
         # Check if user exists and has appropriate permissions
         user = db.query(models.User).filter(models.User.id == user_id).first()
         if not user:
@@ -145,6 +125,7 @@ async def face_enroll(
             user.face_encoding = face_encoding.tobytes()
             db.commit()
             logger.info(f"Face encoding saved successfully for user {user_id}")
+            await face_client.gallery_changed(user_id)
             
         except Exception as e:
             logger.error(f"Database error: {e}")
@@ -230,6 +211,7 @@ async def delete_face_enrollment(
 
         user.face_encoding = None
         db.commit()
+        await face_client.gallery_changed(user_id)
         
         return {
             "message": f"Face encoding removed successfully for user {user.name}",
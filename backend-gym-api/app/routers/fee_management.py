@@ -1,10 +1,13 @@
 # backend/routers/fee_management.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from sqlalchemy import func
-from .. import models, schemas, database, utils
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+from sqlalchemy import and_, event, func, or_, select, update
+from .. import models, schemas, database, utils, email_outbox, email_templates, pagination, revenue
+from ..cache import TTLCache
 from datetime import date, datetime # Import date and datetime
+import os
 import uuid
 
 router = APIRouter(prefix="/fees", tags=["Fee Management"])
@@ -12,7 +15,7 @@ router = APIRouter(prefix="/fees", tags=["Fee Management"])
 # --- NEW HELPER FUNCTION FOR SENDING PAYMENT EMAIL ---
 def send_payment_receipt_email(db: Session, fee: models.FeeAssignment):
     """
-    Fetches user details and sends a payment confirmation email.
+    Fetches user details and queues a payment confirmation email.
     """
     user = db.query(models.User).filter(models.User.id == fee.user_id).first()
     if not user:
@@ -21,63 +24,17 @@ def send_payment_receipt_email(db: Session, fee: models.FeeAssignment):
 
     subject = f"Payment Confirmation - {fee.fee_type}"
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Payment Confirmation</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ width: 90%; max-width: 600px; margin: 20px auto; border: 1px solid #ddd; border-radius: 8px; overflow: hidden; }}
-            .header {{ background-color: #FF6600; color: white; padding: 20px; text-align: center; }}
-            .content {{ padding: 20px; }}
-            .footer {{ background-color: #f2f2f2; padding: 10px; text-align: center; font-size: 12px; color: #777; }}
-            .details-table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
-            .details-table th, .details-table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-            .details-table th {{ background-color: #f9f9f9; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>Payment Successful!</h1>
-            </div>
-            <div class="content">
-                <p>Dear {user.name},</p>
-                <p>We have successfully received your payment. Thank you for your promptness.</p>
-                <p>Here are the details of your transaction:</p>
-                <table class="details-table">
-                    <tr>
-                        <th>Fee Type</th>
-                        <td>{fee.fee_type}</td>
-                    </tr>
-                    <tr>
-                        <th>Amount Paid</th>
-                        <td>₹{fee.amount:.2f}</td>
-                    </tr>
-                    <tr>
-                        <th>Payment Method</th>
-                        <td>{fee.payment_type or 'N/A'}</td>
-                    </tr>
-                     <tr>
-                        <th>Payment Date</th>
-                        <td>{datetime.utcnow().strftime('%d %B %Y')}</td>
-                    </tr>
-                </table>
-                <p>Your account is up to date. If you have any questions, feel free to contact us.</p>
-                <p>Stay Fit, Stay Healthy!<br>The SmartFlex Fitness Team</p>
-            </div>
-            <div class="footer">
-                <p>&copy; {datetime.utcnow().year} SmartFlex Fitness. All rights reserved.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    utils.send_email(to_email=user.email, subject=subject, html_content=html_content)
+    html_content = email_templates.render(
+        email_templates.RECEIPT,
+        name=user.name,
+        fee_type=fee.fee_type,
+        amount=fee.amount,
+        payment_type=fee.payment_type,
+        payment_date=datetime.utcnow(),
+    )
+
+    email_outbox.enqueue_email(db, to_email=user.email, subject=subject, html_content=html_content)
+    db.commit()
 # --- END NEW HELPER ---
 
 
@@ -130,63 +87,146 @@ def assign_fee(
     
     return schemas.FeeAssignmentResponse(**new_fee_dict)
 
+FEES_DEFAULT_LIMIT = 100
+FEES_MAX_LIMIT = 500
+
+FEE_COLUMNS = (
+    models.FeeAssignment.id,
+    models.FeeAssignment.user_id,
+    models.FeeAssignment.assigned_by_user_id,
+    models.FeeAssignment.branch_name,
+    models.FeeAssignment.fee_type,
+    models.FeeAssignment.amount,
+    models.FeeAssignment.due_date,
+    models.FeeAssignment.is_paid,
+    models.FeeAssignment.payment_type,
+    models.FeeAssignment.created_at,
+    models.FeeAssignment.updated_at,
+)
+
+
+def fee_page_query(
+    query,
+    branch: Optional[str] = None,
+    is_paid: Optional[bool] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = FEES_DEFAULT_LIMIT,
+):
+    """
+    Applies the shared fee list filters to query and pages it by keyset on
+    (due_date, id), latest due date first. Fetches limit + 1 rows; pass them to
+    fee_page to trim the extra row and set X-Next-Cursor.
+    """
+    fee = models.FeeAssignment
+    if branch:
+        query = query.where(fee.branch_name == branch)
+    if is_paid is not None:
+        query = query.where(fee.is_paid == is_paid)
+    if due_from:
+        query = query.where(fee.due_date >= due_from)
+    if due_to:
+        query = query.where(fee.due_date <= due_to)
+    if cursor:
+        due_date, fee_id = pagination.decode_cursor(cursor, date, int)
+        query = query.where(or_(
+            fee.due_date < due_date,
+            and_(fee.due_date == due_date, fee.id < fee_id),
+        ))
+    return query.order_by(fee.due_date.desc(), fee.id.desc()).limit(limit + 1)
+
+
+def fee_page(response: Response, rows, limit: int):
+    page = rows[:limit]
+    if len(rows) > limit:
+        pagination.set_cursor_header(
+            response, pagination.NEXT_CURSOR_HEADER, pagination.encode_cursor(page[-1].due_date, page[-1].id)
+        )
+    return page
+
+
 # NEW ENDPOINT: Get all fee assignments for a branch (admin/superadmin only)
 @router.get("/branch", response_model=List[schemas.FeeAssignmentNestedResponse])
 def get_branch_fees(
+    response: Response,
     db: Session = Depends(database.get_db),
     current_admin: schemas.UserResponse = Depends(get_current_admin),  # Only admins/superadmins can access this
     user_id: Optional[int] = None,  # Optional filter by user ID
-    is_paid: Optional[bool] = None  # Optional filter by paid status
+    is_paid: Optional[bool] = None,  # Optional filter by paid status
+    branch: Optional[str] = Query(None, description="Superadmins only; admins always see their own branch"),
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(FEES_DEFAULT_LIMIT, ge=1, le=FEES_MAX_LIMIT),
 ):
     """
     Allows branch admins and superadmins to view fee assignments for their branch.
-    Superadmins can see fees from all branches.
+    Superadmins can see fees from all branches. Latest due date first, keyset-paginated.
     """
-    query = db.query(models.FeeAssignment).join(
-        models.User, models.FeeAssignment.user_id == models.User.id
-    )
-
     if current_admin.role == "admin":
         if not current_admin.branch:
             raise HTTPException(status_code=400, detail="Admin's branch not specified.")
-        query = query.filter(models.FeeAssignment.branch_name == current_admin.branch)
-    # Superadmins see all fees (no branch filter)
-
+        branch = current_admin.branch
+    # Superadmins see all fees unless they pass a branch
+
+    # Fee and member columns from one join, instead of a User lookup per fee
+    query = select(
+        *FEE_COLUMNS,
+        models.User.name.label("user_name"),
+        models.User.email.label("user_email"),
+        models.User.phone.label("user_phone"),
+        models.User.role.label("user_role"),
+        models.User.gender.label("user_gender"),
+        models.User.branch.label("user_branch"),
+    ).join(models.User, models.FeeAssignment.user_id == models.User.id)
     if user_id is not None:
-        query = query.filter(models.FeeAssignment.user_id == user_id)
-    if is_paid is not None:
-        query = query.filter(models.FeeAssignment.is_paid == is_paid)
-
-    fees = query.all()
-
-    result = []
-    for fee_assignment in fees:
-        user_data = db.query(models.User).filter(models.User.id == fee_assignment.user_id).first()
-        if user_data:
-            fee_assignment_dict = fee_assignment.__dict__.copy()
-            fee_assignment_dict["user"] = schemas.UserResponse.from_orm(user_data)
-            result.append(schemas.FeeAssignmentNestedResponse(**fee_assignment_dict))
-        else:
-            result.append(schemas.FeeAssignmentNestedResponse.from_orm(fee_assignment))
-    return result
+        query = query.where(models.FeeAssignment.user_id == user_id)
+
+    rows = db.execute(fee_page_query(query, branch, is_paid, due_from, due_to, cursor, limit)).all()
+    return [
+        {
+            **{column.key: row._mapping[column.key] for column in FEE_COLUMNS},
+            "user": {
+                "id": row.user_id,
+                "name": row.user_name,
+                "email": row.user_email,
+                "phone": row.user_phone,
+                "role": row.user_role,
+                "gender": row.user_gender,
+                "branch": row.user_branch,
+            },
+        }
+        for row in fee_page(response, rows, limit)
+    ]
 
 # NEW ENDPOINT: Get all fees for all users (superadmin only)
 @router.get("/all", response_model=List[schemas.FeeAssignmentResponse])
 def get_all_fees(
+    response: Response,
     db: Session = Depends(database.get_db),
-    current_superadmin: schemas.UserResponse = Depends(get_current_superadmin)
+    current_superadmin: schemas.UserResponse = Depends(get_current_superadmin),
+    branch: Optional[str] = None,
+    is_paid: Optional[bool] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(FEES_DEFAULT_LIMIT, ge=1, le=FEES_MAX_LIMIT),
 ):
-    fees = db.query(models.FeeAssignment).all()
-    result = []
-    for fee in fees:
-        user = db.query(models.User).filter(models.User.id == fee.user_id).first()
-        assigned_by_user = db.query(models.User).filter(models.User.id == fee.assigned_by_user_id).first()
-        fee_dict = fee.__dict__.copy()
-        fee_dict['user_name'] = user.name if user else "N/A"
-        fee_dict['assigned_by_name'] = assigned_by_user.name if assigned_by_user else "N/A"
-        result.append(schemas.FeeAssignmentResponse(**fee_dict))
-    
-    return result
+    """Every branch's fees with member and assigner names, latest due date first, keyset-paginated."""
+    member = aliased(models.User)
+    assigned_by = aliased(models.User)
+    query = (
+        select(
+            *FEE_COLUMNS,
+            func.coalesce(member.name, "N/A").label("user_name"),
+            func.coalesce(assigned_by.name, "N/A").label("assigned_by_name"),
+        )
+        .outerjoin(member, member.id == models.FeeAssignment.user_id)
+        .outerjoin(assigned_by, assigned_by.id == models.FeeAssignment.assigned_by_user_id)
+    )
+    rows = db.execute(fee_page_query(query, branch, is_paid, due_from, due_to, cursor, limit)).all()
+    return [row._mapping for row in fee_page(response, rows, limit)]
 
 # NEW ENDPOINT: Mark a fee as paid/unpaid and generate a receipt (superadmin only)
 @router.patch("/{fee_id}", response_model=schemas.FeeAssignmentResponse)
@@ -258,34 +298,80 @@ def get_fee_receipt(
     return receipt_data
 
 
-@router.get("/analytics", response_model=schemas.FeeAnalyticsResponse)
-def get_fee_analytics(
-    db: Session = Depends(database.get_db),
-    current_superadmin: schemas.UserResponse = Depends(get_current_superadmin)
-):
-    total_fees_assigned = db.query(func.sum(models.FeeAssignment.amount)).scalar() or 0
-    total_fees_paid = db.query(func.sum(models.FeeAssignment.amount)).filter(models.FeeAssignment.is_paid == True).scalar() or 0
-    total_outstanding_fees = total_fees_assigned - total_fees_paid
+# --- Fee analytics cache ---
+# Analytics are cached per filter combination for a few seconds; entries are dropped
+# whenever a FeeAssignment is written through the ORM in this process.
+FEE_ANALYTICS_TTL_SECONDS = float(os.getenv("FEE_ANALYTICS_TTL_SECONDS", 15))
+_fee_analytics_cache = TTLCache(FEE_ANALYTICS_TTL_SECONDS, maxsize=256)
+
+def _forget_fee_analytics(mapper, connection, target):
+    _fee_analytics_cache.clear()
 
-    paid_by_card = db.query(func.sum(models.FeeAssignment.amount)).filter(models.FeeAssignment.payment_type == "Card").scalar() or 0
-    paid_by_cash = db.query(func.sum(models.FeeAssignment.amount)).filter(models.FeeAssignment.payment_type == "Cash").scalar() or 0
-    paid_by_upi = db.query(func.sum(models.FeeAssignment.amount)).filter(models.FeeAssignment.payment_type == "UPI").scalar() or 0
-    paid_by_cheque = db.query(func.sum(models.FeeAssignment.amount)).filter(models.FeeAssignment.payment_type == "Cheque").scalar() or 0
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(models.FeeAssignment, _event_name, _forget_fee_analytics)
+
+def fee_analytics(
+    db: Session,
+    branch: Optional[str] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+) -> schemas.FeeAnalyticsResponse:
+    """
+    Assigned, paid and outstanding totals plus the paid amount per payment method,
+    from one scan of fee_assignments grouped by payment type and paid status.
+    """
+    method = func.lower(func.coalesce(models.FeeAssignment.payment_type, ""))
+    query = select(
+        method.label("method"),
+        models.FeeAssignment.is_paid,
+        func.sum(models.FeeAssignment.amount).label("amount"),
+    ).group_by(method, models.FeeAssignment.is_paid)
+    if branch:
+        query = query.where(models.FeeAssignment.branch_name == branch)
+    if due_from:
+        query = query.where(models.FeeAssignment.due_date >= due_from)
+    if due_to:
+        query = query.where(models.FeeAssignment.due_date <= due_to)
+
+    total_fees_assigned = total_fees_paid = 0.0
+    by_payment_type: Dict[str, float] = {}
+    for row in db.execute(query):
+        amount = float(row.amount or 0)
+        total_fees_assigned += amount
+        if not row.is_paid:
+            continue
+        total_fees_paid += amount
+        label = revenue.payment_type_label(row.method)
+        by_payment_type[label] = by_payment_type.get(label, 0.0) + amount
 
     return schemas.FeeAnalyticsResponse(
         total_fees_assigned=total_fees_assigned,
         total_fees_paid=total_fees_paid,
-        total_outstanding_fees=total_outstanding_fees,
-        paid_by_card=paid_by_card,
-        paid_by_cash=paid_by_cash,
-        paid_by_upi=paid_by_upi,
-        paid_by_cheque=paid_by_cheque
+        total_outstanding_fees=total_fees_assigned - total_fees_paid,
+        paid_by_card=by_payment_type.get("Card", 0.0),
+        paid_by_cash=by_payment_type.get("Cash", 0.0),
+        paid_by_upi=by_payment_type.get("UPI", 0.0),
+        paid_by_cheque=by_payment_type.get("Cheque", 0.0),
+        by_payment_type=dict(sorted(by_payment_type.items(), key=lambda item: -item[1])),
     )
 
+@router.get("/analytics", response_model=schemas.FeeAnalyticsResponse)
+def get_fee_analytics(
+    branch: Optional[str] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    db: Session = Depends(database.get_db),
+    current_superadmin: schemas.UserResponse = Depends(get_current_superadmin)
+):
+    key = (branch, due_from, due_to)
+    analytics = _fee_analytics_cache.get(key)
+    if analytics is None:
+        analytics = fee_analytics(db, branch, due_from, due_to)
+        _fee_analytics_cache.set(key, analytics)
+    return analytics
+
 from io import BytesIO
-from openpyxl import Workbook
 from fastapi.responses import StreamingResponse
-from typing import Dict, List
 
 from fastapi import Query
 
@@ -294,39 +380,11 @@ def get_monthly_revenue(
     db: Session = Depends(database.get_db),
     current_superadmin: schemas.UserResponse = Depends(get_current_superadmin),
     start_month: str = Query(None, description="YYYY-MM"),
-    end_month: str = Query(None, description="YYYY-MM")
+    end_month: str = Query(None, description="YYYY-MM"),
+    split_by: List[str] = Query([], description="Also split each month by branch and/or payment_type")
 ):
-    revenue_map: Dict[str, float] = {}
-
-    try:
-        receipts = db.query(models.FeeReceipt).filter(models.FeeReceipt.payment_date != None).all()
-    except Exception:
-        receipts = []
-
-    if receipts:
-        for r in receipts:
-            if not r.payment_date:
-                continue
-            month_key = r.payment_date.strftime("%Y-%m")
-            revenue_map[month_key] = revenue_map.get(month_key, 0.0) + float(r.amount or 0.0)
-    else:
-        assignments = db.query(models.FeeAssignment).filter(models.FeeAssignment.is_paid == True).all()
-        for a in assignments:
-            dt = getattr(a, "updated_at", None) or getattr(a, "created_at", None)
-            if not dt:
-                continue
-            month_key = dt.strftime("%Y-%m")
-            revenue_map[month_key] = revenue_map.get(month_key, 0.0) + float(a.amount or 0.0)
-
-    # Filter by start/end month if provided
-    months = sorted(revenue_map.keys(), reverse=True)
-    if start_month:
-        months = [m for m in months if m >= start_month]
-    if end_month:
-        months = [m for m in months if m <= end_month]
-
-    items = [{"month": m, "total": revenue_map[m]} for m in months]
-    return items
+    rows = revenue.monthly_revenue(db, start_month, end_month, split_by)
+    return [row._asdict() for row in rows]
 
 
 @router.get("/export/monthly")
@@ -334,45 +392,23 @@ def export_monthly_revenue(
     db: Session = Depends(database.get_db),
     current_superadmin: schemas.UserResponse = Depends(get_current_superadmin),
     start_month: str = Query(None, description="YYYY-MM"),
-    end_month: str = Query(None, description="YYYY-MM")
+    end_month: str = Query(None, description="YYYY-MM"),
+    split_by: List[str] = Query([], description="Also split each month by branch and/or payment_type")
 ):
-    revenue_map: Dict[str, float] = {}
-
-    try:
-        receipts = db.query(models.FeeReceipt).filter(models.FeeReceipt.payment_date != None).all()
-    except Exception:
-        receipts = []
-
-    if receipts:
-        for r in receipts:
-            if not r.payment_date:
-                continue
-            month_key = r.payment_date.strftime("%Y-%m")
-            revenue_map[month_key] = revenue_map.get(month_key, 0.0) + float(r.amount or 0.0)
-    else:
-        assignments = db.query(models.FeeAssignment).filter(models.FeeAssignment.is_paid == True).all()
-        for a in assignments:
-            dt = getattr(a, "updated_at", None) or getattr(a, "created_at", None)
-            if not dt:
-                continue
-            month_key = dt.strftime("%Y-%m")
-            revenue_map[month_key] = revenue_map.get(month_key, 0.0) + float(a.amount or 0.0)
-
-    # Filter by date range
-    months = sorted(revenue_map.keys(), reverse=True)
-    if start_month:
-        months = [m for m in months if m >= start_month]
-    if end_month:
-        months = [m for m in months if m <= end_month]
+    rows = revenue.monthly_revenue(db, start_month, end_month, split_by)
 
     # Create Excel
+    from openpyxl import Workbook  # only the Excel export needs it
+
     wb = Workbook()
     ws = wb.active
     ws.title = "Monthly Revenue"
-    ws.append(["Month", "Total Revenue (INR)"])
+    split_titles = {"branch": "Branch", "payment_type": "Payment Type"}
+    splits = [split for split in revenue.REVENUE_SPLITS if split in split_by]
+    ws.append(["Month", *[split_titles[split] for split in splits], "Total Revenue (INR)"])
 
-    for month in months:
-        ws.append([month, round(revenue_map[month], 2)])
+    for row in rows:
+        ws.append([row.month, *[getattr(row, split) for split in splits], round(row.total, 2)])
 
     output = BytesIO()
     wb.save(output)
@@ -445,52 +481,143 @@ def update_fee_status(
 
 
 @router.get("/my-fees", response_model=List[schemas.UserFeesResponse])
-def get_my_fees(
-    db: Session = Depends(database.get_db),
-    current_user: schemas.UserResponse = Depends(utils.get_current_user)
+async def get_my_fees(
+    response: Response,
+    is_paid: Optional[bool] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(FEES_DEFAULT_LIMIT, ge=1, le=FEES_MAX_LIMIT),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserResponse = Depends(utils.get_current_user_async)
 ):
-    fees = db.query(models.FeeAssignment).filter(models.FeeAssignment.user_id == current_user.id).all()
-    result = []
-    for f in fees:
-        assigned_by = db.query(models.User).filter(models.User.id == f.assigned_by_user_id).first()
-        result.append(schemas.UserFeesResponse(
-            id=f.id,
-            fee_type=f.fee_type,
-            amount=f.amount,
-            due_date=f.due_date,
-            is_paid=f.is_paid,
-            assigned_by_name=assigned_by.name if assigned_by else "Unknown",
-            branch_name=f.branch_name
-        ))
-    return result
+    fee = models.FeeAssignment
+    assigned_by = aliased(models.User)
+    query = (
+        select(
+            fee.id,
+            fee.fee_type,
+            fee.amount,
+            fee.due_date,
+            fee.is_paid,
+            func.coalesce(assigned_by.name, "Unknown").label("assigned_by_name"),
+            fee.branch_name,
+        )
+        .outerjoin(assigned_by, assigned_by.id == fee.assigned_by_user_id)
+        .where(fee.user_id == current_user.id)
+    )
+    rows = (await db.execute(fee_page_query(query, None, is_paid, due_from, due_to, cursor, limit))).all()
+    return [row._mapping for row in fee_page(response, rows, limit)]
+
+NOTIFICATIONS_DEFAULT_LIMIT = 50
+NOTIFICATIONS_MAX_LIMIT = 200
 
 @router.get("/notifications", response_model=List[schemas.UserNotificationResponse])
-def get_user_notifications(
-    db: Session = Depends(database.get_db),
-    current_user: schemas.UserResponse = Depends(utils.get_current_user)
+async def get_user_notifications(
+    response: Response,
+    limit: int = Query(NOTIFICATIONS_DEFAULT_LIMIT, ge=1, le=NOTIFICATIONS_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page, for older notifications"),
+    since: Optional[str] = Query(None, description="X-Latest-Cursor from an earlier response, for only newer notifications"),
+    unread_only: bool = False,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserResponse = Depends(utils.get_current_user_async)
 ):
-    return db.query(models.UserNotification).filter(models.UserNotification.user_id == current_user.id).order_by(models.UserNotification.created_at.desc()).all()
+    """
+    Newest first, keyset-paginated on (created_at, id). X-Next-Cursor is set when older
+    notifications remain; X-Latest-Cursor marks the newest one seen, to pass as since.
 
-@router.put("/notifications/mark-all-read", response_model=List[schemas.UserNotificationResponse])
+    With since, the page walks forward instead: it holds the oldest `limit` notifications
+    newer than since (still returned newest first) and X-Latest-Cursor is the newest of
+    them. A full page means more may follow; call again with the new X-Latest-Cursor.
+    """
+    notification = models.UserNotification
+    query = select(notification).where(notification.user_id == current_user.id)
+    if unread_only:
+        query = query.where(notification.is_read == False)
+    if cursor:
+        created_at, notification_id = pagination.decode_cursor(cursor, datetime, int)
+        query = query.where(or_(
+            notification.created_at < created_at,
+            and_(notification.created_at == created_at, notification.id < notification_id),
+        ))
+    if since:
+        created_at, notification_id = pagination.decode_cursor(since, datetime, int)
+        query = query.where(or_(
+            notification.created_at > created_at,
+            and_(notification.created_at == created_at, notification.id > notification_id),
+        ))
+        # Oldest first, so notifications beyond this page are not skipped by the next since
+        rows = (await db.scalars(
+            query.order_by(notification.created_at, notification.id).limit(limit)
+        )).all()
+        pagination.set_cursor_header(
+            response,
+            pagination.LATEST_CURSOR_HEADER,
+            pagination.encode_cursor(rows[-1].created_at, rows[-1].id) if rows else since,
+        )
+        return rows[::-1]
+
+    # One extra row tells whether another page exists
+    rows = (await db.scalars(
+        query.order_by(notification.created_at.desc(), notification.id.desc()).limit(limit + 1)
+    )).all()
+    page = rows[:limit]
+
+    if len(rows) > limit:
+        last = page[-1]
+        pagination.set_cursor_header(response, pagination.NEXT_CURSOR_HEADER, pagination.encode_cursor(last.created_at, last.id))
+    if page:
+        pagination.set_cursor_header(response, pagination.LATEST_CURSOR_HEADER, pagination.encode_cursor(page[0].created_at, page[0].id))
+    return page
+
+@router.put("/notifications/mark-all-read", response_model=schemas.NotificationsMarkedRead)
 def mark_all_notifications_read(
     db: Session = Depends(database.get_db),
     current_user: schemas.UserResponse = Depends(utils.get_current_user)
 ):
     """
-    Marks all unread notifications for the current user as read.
+    Marks all unread notifications for the current user as read with a single UPDATE
+    and returns how many were changed.
     """
-    notifications_to_update = db.query(models.UserNotification).filter(
-        models.UserNotification.user_id == current_user.id,
-        models.UserNotification.is_read == False
-    ).all()
-
-    for notif in notifications_to_update:
-        notif.is_read = True
-
+    result = db.execute(
+        update(models.UserNotification)
+        .where(
+            models.UserNotification.user_id == current_user.id,
+            models.UserNotification.is_read == False
+        )
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
+    return {"updated": result.rowcount}
 
-    # Refresh all notifications to return the updated list
-    return db.query(models.UserNotification).filter(models.UserNotification.user_id == current_user.id).order_by(models.UserNotification.created_at.desc()).all()
+@router.get("/notifications/unread-count", response_model=schemas.UnreadNotificationCount)
+async def get_unread_notification_count(
+    response: Response,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserResponse = Depends(utils.get_current_user_async)
+):
+    """
+    Cheap endpoint for clients to poll; served from the partial index on unread rows.
+    X-Latest-Cursor marks the user's newest notification, so a client can tell that
+    new ones arrived even when the unread count did not change.
+    """
+    notification = models.UserNotification
+    unread_count = await db.scalar(
+        select(func.count()).select_from(notification).where(
+            notification.user_id == current_user.id,
+            notification.is_read == False
+        )
+    )
+    latest = (await db.execute(
+        select(notification.created_at, notification.id)
+        .where(notification.user_id == current_user.id)
+        .order_by(notification.created_at.desc(), notification.id.desc())
+        .limit(1)
+    )).first()
+    if latest:
+        pagination.set_cursor_header(response, pagination.LATEST_CURSOR_HEADER, pagination.encode_cursor(latest.created_at, latest.id))
+    return {"unread_count": unread_count}
 
 
 @router.put("/notifications/{notification_id}", response_model=schemas.UserNotificationResponse)
@@ -511,14 +638,19 @@ def mark_notification_read(
     db.refresh(notif)
     return notif
 
-import razorpay
 from fastapi import Request
+from functools import lru_cache
 from starlette.responses import JSONResponse
 import os
 
-razorpay_client = razorpay.Client(
-    auth=(os.getenv("RAZORPAY_KEY_ID"), os.getenv("RAZORPAY_KEY_SECRET"))
-)
+@lru_cache(maxsize=None)
+def get_razorpay_client():
+    # Created on the first payment request rather than when the app loads
+    import razorpay
+
+    return razorpay.Client(
+        auth=(os.getenv("RAZORPAY_KEY_ID"), os.getenv("RAZORPAY_KEY_SECRET"))
+    )
 
 # ✅ Create Razorpay Order
 @router.post("/{fee_id}/create-order")
@@ -537,7 +669,7 @@ def create_order(fee_id: int, db: Session = Depends(database.get_db), current_us
         "receipt": f"receipt_fee_{fee.id}",
         "payment_capture": 1
     }
-    order = razorpay_client.order.create(order_data)
+    order = get_razorpay_client().order.create(order_data)
 
     return {"order_id": order["id"], "amount": order_data["amount"], "currency": order_data["currency"], "key": os.getenv("RAZORPAY_KEY_ID")}
 
@@ -565,12 +697,12 @@ async def verify_payment(request: Request, db: Session = Depends(database.get_db
             "razorpay_payment_id": razorpay_payment_id,
             "razorpay_signature": razorpay_signature
         }
-        razorpay_client.utility.verify_payment_signature(params_dict)
+        get_razorpay_client().utility.verify_payment_signature(params_dict)
 
         # --- NEW CODE START ---
 
         # Step 2: Fetch payment details from Razorpay API
-        payment_details = razorpay_client.payment.fetch(razorpay_payment_id)
+        payment_details = get_razorpay_client().payment.fetch(razorpay_payment_id)
 
         # Step 3: Extract the payment method
         # The 'method' key will contain 'card', 'upi', 'netbanking', etc.
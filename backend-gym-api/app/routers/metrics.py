@@ -0,0 +1,19 @@
+# backend/routers/metrics.py
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict
+from .. import metrics, schemas, utils
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+# Dependency to get current superadmin
+def get_current_superadmin(current_user: schemas.UserResponse = Depends(utils.get_current_user)):
+    if current_user.role != "superadmin":
+        raise HTTPException(status_code=403, detail="Only superadmins can perform this action.")
+    return current_user
+
+@router.get("/")
+def get_metrics(current_superadmin: schemas.UserResponse = Depends(get_current_superadmin)) -> Dict:
+    """
+    Returns this worker's in-process counters, gauges and timings. Superadmins only.
+    """
+    return metrics.snapshot()
@@ -1,10 +1,10 @@
 # routers/trainers.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, time
-from .. import models, schemas, database, utils
-from sqlalchemy import and_
+from .. import models, schemas, database, plans, utils
+from sqlalchemy import and_, func
 from sqlalchemy.orm import joinedload
 
 
@@ -641,30 +641,7 @@ def create_diet_plan(
     db.commit()
     db.refresh(new_diet_plan)
 
-    trainer_data = db.query(models.Trainer).filter(models.Trainer.id == current_trainer.id).first()
-    if trainer_data:
-        trainer_data.specialization = trainer_data.specialization.split(",") if isinstance(trainer_data.specialization, str) and trainer_data.specialization else []
-        trainer_schema = schemas.TrainerResponse.from_orm(trainer_data)
-    else:
-        trainer_schema = schemas.TrainerResponse(
-            id=current_trainer.id,
-            name=current_trainer.name,
-            specialization=[],
-            rating=0.0, experience=0, phone="", email="", availability=None, branch_name=current_trainer.branch
-        )
-
-    return schemas.DietPlanResponse(
-        id=new_diet_plan.id,
-        user_id=new_diet_plan.user_id,
-        assigned_by_trainer_id=new_diet_plan.assigned_by_trainer_id,
-        title=new_diet_plan.title,
-        description=new_diet_plan.description,
-        assigned_date=new_diet_plan.assigned_date,
-        expiry_date=new_diet_plan.expiry_date,
-        branch_name=new_diet_plan.branch_name,
-        user=schemas.UserResponse.from_orm(user),
-        assigned_by_trainer=trainer_schema
-    )
+    return plans.plan_response(new_diet_plan, schemas.DietPlanResponse, current_trainer.name, current_trainer.branch)
 
 @router.put("/diet-plans/{plan_id}", response_model=schemas.DietPlanResponse)
 def update_diet_plan(
@@ -701,29 +678,7 @@ def update_diet_plan(
 
     db.commit()
     db.refresh(db_diet_plan)
-
-    user = db.query(models.User).filter(models.User.id == db_diet_plan.user_id).first()
-    trainer_data = db.query(models.Trainer).filter(models.Trainer.id == db_diet_plan.assigned_by_trainer_id).first()
-    if trainer_data:
-        trainer_data.specialization = trainer_data.specialization.split(",") if isinstance(trainer_data.specialization, str) and trainer_data.specialization else []
-        trainer_schema = schemas.TrainerResponse.from_orm(trainer_data)
-    else:
-        trainer_schema = schemas.TrainerResponse(
-            id=db_diet_plan.assigned_by_trainer_id, name="Unknown Trainer", specialization=[], rating=0.0, experience=0, phone="", email="", availability=None, branch_name=None
-        )
-
-    return schemas.DietPlanResponse(
-        id=db_diet_plan.id,
-        user_id=db_diet_plan.user_id,
-        assigned_by_trainer_id=db_diet_plan.assigned_by_trainer_id,
-        title=db_diet_plan.title,
-        description=db_diet_plan.description,
-        assigned_date=db_diet_plan.assigned_date,
-        expiry_date=db_diet_plan.expiry_date,
-        branch_name=db_diet_plan.branch_name,
-        user=schemas.UserResponse.from_orm(user),
-        assigned_by_trainer=trainer_schema
-    )
+    return plans.plan_response(db_diet_plan, schemas.DietPlanResponse)
 
 @router.delete("/diet-plans/{plan_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_diet_plan(
@@ -753,42 +708,32 @@ def delete_diet_plan(
 
 @router.get("/diet-plans", response_model=List[schemas.DietPlanResponse])
 def get_trainer_diet_plans(
+    response: Response,
     db: Session = Depends(database.get_db),
     current_trainer: schemas.UserResponse = Depends(get_current_trainer),
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(plans.PLANS_DEFAULT_LIMIT, ge=1, le=plans.PLANS_MAX_LIMIT),
 ):
     """
     Allows a trainer to view diet plans assigned by them, optionally filtered by user.
+    Newest first; follow X-Next-Cursor for older plans.
     """
-    query = db.query(models.DietPlan).filter(
+    criteria = [
         models.DietPlan.assigned_by_trainer_id == current_trainer.id,
-        models.DietPlan.branch_name == current_trainer.branch
-    ).join(models.User, models.DietPlan.user_id == models.User.id)
-
+        models.DietPlan.branch_name == current_trainer.branch,
+    ]
     if user_id:
-        query = query.filter(models.DietPlan.user_id == user_id)
+        criteria.append(models.DietPlan.user_id == user_id)
 
-    diet_plans = query.all()
-
-    result = []
-    trainer_data = db.query(models.Trainer).filter(models.Trainer.id == current_trainer.id).first()
-    if trainer_data:
-        trainer_data.specialization = trainer_data.specialization.split(",") if isinstance(trainer_data.specialization, str) and trainer_data.specialization else []
-        trainer_schema = schemas.TrainerResponse.from_orm(trainer_data)
-    else:
-        trainer_schema = schemas.TrainerResponse(
-            id=current_trainer.id,
-            name=current_trainer.name,
-            specialization=[],
-            rating=0.0, experience=0, phone="", email="", availability=None, branch_name=current_trainer.branch
-        )
+    diet_plans = plans.plans_page(
+        response, plans.list_plans(db, models.DietPlan, *criteria, cursor=cursor, limit=limit, member_required=True), limit
+    )
 
-    for dp in diet_plans:
-        dp_dict = dp.__dict__.copy()
-        dp_dict['user'] = schemas.UserResponse.from_orm(db.query(models.User).filter(models.User.id == dp.user_id).first())
-        dp_dict['assigned_by_trainer'] = trainer_schema
-        result.append(schemas.DietPlanResponse(**dp_dict))
-    return result
+    return [
+        plans.plan_response(dp, schemas.DietPlanResponse, current_trainer.name, current_trainer.branch)
+        for dp in diet_plans
+    ]
 
 @router.post("/exercise-plans", response_model=schemas.ExercisePlanResponse)
 def create_exercise_plan(
@@ -839,30 +784,7 @@ def create_exercise_plan(
     db.commit()
     db.refresh(new_exercise_plan)
 
-    trainer_data = db.query(models.Trainer).filter(models.Trainer.id == current_trainer.id).first()
-    if trainer_data:
-        trainer_data.specialization = trainer_data.specialization.split(",") if isinstance(trainer_data.specialization, str) and trainer_data.specialization else []
-        trainer_schema = schemas.TrainerResponse.from_orm(trainer_data)
-    else:
-        trainer_schema = schemas.TrainerResponse(
-            id=current_trainer.id,
-            name=current_trainer.name,
-            specialization=[],
-            rating=0.0, experience=0, phone="", email="", availability=None, branch_name=current_trainer.branch
-        )
-
-    return schemas.ExercisePlanResponse(
-        id=new_exercise_plan.id,
-        user_id=new_exercise_plan.user_id,
-        assigned_by_trainer_id=new_exercise_plan.assigned_by_trainer_id,
-        title=new_exercise_plan.title,
-        description=new_exercise_plan.description,
-        assigned_date=new_exercise_plan.assigned_date,
-        expiry_date=new_exercise_plan.expiry_date,
-        branch_name=new_exercise_plan.branch_name,
-        user=schemas.UserResponse.from_orm(user),
-        assigned_by_trainer=trainer_schema
-    )
+    return plans.plan_response(new_exercise_plan, schemas.ExercisePlanResponse, current_trainer.name, current_trainer.branch)
 
 @router.put("/exercise-plans/{plan_id}", response_model=schemas.ExercisePlanResponse)
 def update_exercise_plan(
@@ -899,29 +821,7 @@ def update_exercise_plan(
 
     db.commit()
     db.refresh(db_exercise_plan)
-
-    user = db.query(models.User).filter(models.User.id == db_exercise_plan.user_id).first()
-    trainer_data = db.query(models.Trainer).filter(models.Trainer.id == db_exercise_plan.assigned_by_trainer_id).first()
-    if trainer_data:
-        trainer_data.specialization = trainer_data.specialization.split(",") if isinstance(trainer_data.specialization, str) and trainer_data.specialization else []
-        trainer_schema = schemas.TrainerResponse.from_orm(trainer_data)
-    else:
-        trainer_schema = schemas.TrainerResponse(
-            id=db_exercise_plan.assigned_by_trainer_id, name="Unknown Trainer", specialization=[], rating=0.0, experience=0, phone="", email="", availability=None, branch_name=None
-        )
-
-    return schemas.ExercisePlanResponse(
-        id=db_exercise_plan.id,
-        user_id=db_exercise_plan.user_id,
-        assigned_by_trainer_id=db_exercise_plan.assigned_by_trainer_id,
-        title=db_exercise_plan.title,
-        description=db_exercise_plan.description,
-        assigned_date=db_exercise_plan.assigned_date,
-        expiry_date=db_exercise_plan.expiry_date,
-        branch_name=db_exercise_plan.branch_name,
-        user=schemas.UserResponse.from_orm(user),
-        assigned_by_trainer=trainer_schema
-    )
+    return plans.plan_response(db_exercise_plan, schemas.ExercisePlanResponse)
 
 @router.delete("/exercise-plans/{plan_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_exercise_plan(
@@ -951,42 +851,32 @@ def delete_exercise_plan(
 
 @router.get("/exercise-plans", response_model=List[schemas.ExercisePlanResponse])
 def get_trainer_exercise_plans(
+    response: Response,
     db: Session = Depends(database.get_db),
     current_trainer: schemas.UserResponse = Depends(get_current_trainer),
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(plans.PLANS_DEFAULT_LIMIT, ge=1, le=plans.PLANS_MAX_LIMIT),
 ):
     """
     Allows a trainer to view exercise plans assigned by them, optionally filtered by user.
+    Newest first; follow X-Next-Cursor for older plans.
     """
-    query = db.query(models.ExercisePlan).filter(
+    criteria = [
         models.ExercisePlan.assigned_by_trainer_id == current_trainer.id,
-        models.ExercisePlan.branch_name == current_trainer.branch
-    ).join(models.User, models.ExercisePlan.user_id == models.User.id)
-
+        models.ExercisePlan.branch_name == current_trainer.branch,
+    ]
     if user_id:
-        query = query.filter(models.ExercisePlan.user_id == user_id)
+        criteria.append(models.ExercisePlan.user_id == user_id)
 
-    exercise_plans = query.all()
-
-    result = []
-    trainer_data = db.query(models.Trainer).filter(models.Trainer.id == current_trainer.id).first()
-    if trainer_data:
-        trainer_data.specialization = trainer_data.specialization.split(",") if isinstance(trainer_data.specialization, str) and trainer_data.specialization else []
-        trainer_schema = schemas.TrainerResponse.from_orm(trainer_data)
-    else:
-        trainer_schema = schemas.TrainerResponse(
-            id=current_trainer.id,
-            name=current_trainer.name,
-            specialization=[],
-            rating=0.0, experience=0, phone="", email="", availability=None, branch_name=current_trainer.branch
-        )
+    exercise_plans = plans.plans_page(
+        response, plans.list_plans(db, models.ExercisePlan, *criteria, cursor=cursor, limit=limit, member_required=True), limit
+    )
 
-    for ep in exercise_plans:
-        ep_dict = ep.__dict__.copy()
-        ep_dict['user'] = schemas.UserResponse.from_orm(db.query(models.User).filter(models.User.id == ep.user_id).first())
-        ep_dict['assigned_by_trainer'] = trainer_schema
-        result.append(schemas.ExercisePlanResponse(**ep_dict))
-    return result
+    return [
+        plans.plan_response(ep, schemas.ExercisePlanResponse, current_trainer.name, current_trainer.branch)
+        for ep in exercise_plans
+    ]
 
 @router.post("/add-trainer", response_model=schemas.TrainerResponse)
 def add_trainer(
@@ -994,7 +884,7 @@ def add_trainer(
     db: Session = Depends(database.get_db),
     current_admin: schemas.UserResponse = Depends(get_current_admin_or_superadmin),
 ):
-    existing_trainer = db.query(models.Trainer).filter(models.Trainer.email == trainer.email).first()
+    existing_trainer = db.query(models.Trainer).filter(func.lower(models.Trainer.email) == trainer.email.lower()).first()
     if existing_trainer:
         raise HTTPException(status_code=400, detail="Trainer with this email already exists.")
 
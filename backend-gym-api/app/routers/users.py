@@ -1,16 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, File, UploadFile
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pathlib import Path
 from dotenv import load_dotenv
 from typing import List, Optional
 from datetime import date, datetime, time
 from dateutil.relativedelta import relativedelta  # ⬅️ ADD THIS IMPORT
-from .. import models, schemas, database, utils
+from .. import models, schemas, database, utils, email_outbox, email_templates, attendance, plans
 from app.schemas import BulkAttendanceEntry
 import os
 import secrets
-import cloudinary
-import cloudinary.uploader
+from functools import lru_cache
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -62,7 +63,7 @@ def get_all_users(
 
 @router.post("/")
 def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    existing_user = db.query(models.User).filter(models.User.email == user.email).first()
+    existing_user = db.query(models.User).filter(func.lower(models.User.email) == user.email.lower()).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -81,7 +82,6 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)
         verification_token=verification_token
     )
     
-    # ⬅️ Add user to session but DON'T commit yet
     db.add(db_user)
     
     frontend_url = os.getenv("FRONTEND_URL")
@@ -89,19 +89,12 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)
         raise HTTPException(status_code=500, detail="FRONTEND_URL environment variable is not set.")
 
     verification_url = f"{frontend_url}/verify-email?token={verification_token}"
-    email_content = f"""
-    <h1>Welcome to SmartFlex Fitness!</h1>
-    <p>Please click the link below to verify your email address and activate your account:</p>
-    <a href="{verification_url}">Verify Email Address</a>
-    """
-    
-    try:
-        utils.send_email(to_email=user.email, subject="Verify Your SmartFlex Account", html_content=email_content)
-        db.commit() # ⬅️ Commit only after email is successfully sent
-    except Exception as e:
-        db.rollback() # ⬅️ Rollback if email sending fails
-        raise HTTPException(status_code=500, detail=f"Failed to send verification email. Please try again. Error: {e}")
-        
+    email_content = email_templates.render(email_templates.VERIFICATION, verification_url=verification_url)
+
+    # ⬅️ Queued in the same transaction as the user; the outbox sender delivers it
+    email_outbox.enqueue_email(db, to_email=user.email, subject="Verify Your SmartFlex Account", html_content=email_content)
+    db.commit()
+
     db.refresh(db_user)
     return {"message": "User registered successfully. Please check your email for a verification link."}
 
@@ -277,17 +270,20 @@ def create_attendance_record(
     if not user:
         raise HTTPException(status_code=404, detail="User not found in trainer's branch or does not exist.")
 
-    new_attendance = models.UserAttendance(
-        user_id=attendance_data.user_id,
-        date=attendance_data.date,
-        time=attendance_data.time, # 🌟 ADD time
-        status=attendance_data.status,
-        branch=trainer_branch
-    )
-    db.add(new_attendance)
+    # Upsert: a second record for the same day updates the first instead of duplicating it
+    attendance.upsert_attendance(db, [{
+        "user_id": attendance_data.user_id,
+        "date": attendance_data.date,
+        "time": attendance_data.time, # 🌟 ADD time
+        "status": attendance_data.status,
+        "branch": trainer_branch
+    }])
     db.commit()
-    db.refresh(new_attendance)
-    return new_attendance
+
+    return db.query(models.UserAttendance).filter(
+        models.UserAttendance.user_id == attendance_data.user_id,
+        models.UserAttendance.date == attendance_data.date
+    ).first()
 
 
 @router.put("/manage-attendance/{attendance_id}", response_model=schemas.UserAttendanceResponse)
@@ -351,74 +347,54 @@ def delete_attendance_record(
 
 
 @router.get("/my-attendance", response_model=List[schemas.UserAttendanceResponse])
-def get_my_attendance(
-    db: Session = Depends(database.get_db),
-    current_user: schemas.UserResponse = Depends(get_current_active_user),
+async def get_my_attendance(
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserResponse = Depends(utils.get_current_user_async),
     start_date: Optional[date] = None,
     end_date: Optional[Optional[date]] = None,
 ):
     if not current_user.id:
         raise HTTPException(status_code=400, detail="User ID not available for current user.")
 
-    query = db.query(models.UserAttendance).filter(models.UserAttendance.user_id == current_user.id)
+    stmt = select(models.UserAttendance).where(models.UserAttendance.user_id == current_user.id)
 
     if start_date:
-        query = query.filter(models.UserAttendance.date >= start_date)
+        stmt = stmt.where(models.UserAttendance.date >= start_date)
     if end_date:
-        query = query.filter(models.UserAttendance.date <= end_date)
+        stmt = stmt.where(models.UserAttendance.date <= end_date)
 
-    attendance_records = query.order_by(models.UserAttendance.date.desc()).all()
+    attendance_records = (await db.execute(stmt.order_by(models.UserAttendance.date.desc()))).scalars().all()
     return attendance_records
 
 
 @router.get("/my-diet-plans", response_model=List[schemas.DietPlanResponse])
 def get_my_diet_plans(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(plans.PLANS_DEFAULT_LIMIT, ge=1, le=plans.PLANS_MAX_LIMIT),
     db: Session = Depends(database.get_db),
     current_user: schemas.UserResponse = Depends(get_current_active_user)
 ):
-    diet_plans = db.query(models.DietPlan).filter(models.DietPlan.user_id == current_user.id).all()
-
-    result = []
-    for dp in diet_plans:
-        dp_dict = dp.__dict__.copy()
-
-        user_data = db.query(models.User).filter(models.User.id == dp.user_id).first()
-        dp_dict['user'] = schemas.UserResponse.from_orm(user_data) if user_data else schemas.UserResponse(id=dp.user_id, name="Unknown User", email="", phone="", role="member", branch=None, gender=None)
-
-        trainer_data = db.query(models.Trainer).filter(models.Trainer.id == dp.assigned_by_trainer_id).first()
-        if trainer_data:
-            trainer_data.specialization = trainer_data.specialization.split(",") if isinstance(trainer_data.specialization, str) and trainer_data.specialization else []
-            dp_dict['assigned_by_trainer'] = schemas.TrainerResponse.from_orm(trainer_data)
-        else:
-            dp_dict['assigned_by_trainer'] = schemas.TrainerResponse(id=dp.assigned_by_trainer_id, name="Unknown Trainer", specialization=[], rating=0.0, experience=0, phone="", email="", availability=None, branch_name=None)
-
-        result.append(schemas.DietPlanResponse(**dp_dict))
-    return result
+    """Newest first; follow X-Next-Cursor for older plans."""
+    diet_plans = plans.plans_page(response, plans.list_plans(
+        db, models.DietPlan, models.DietPlan.user_id == current_user.id, cursor=cursor, limit=limit
+    ), limit)
+    return [plans.plan_response(dp, schemas.DietPlanResponse) for dp in diet_plans]
 
 
 @router.get("/my-exercise-plans", response_model=List[schemas.ExercisePlanResponse])
 def get_my_exercise_plans(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(plans.PLANS_DEFAULT_LIMIT, ge=1, le=plans.PLANS_MAX_LIMIT),
     db: Session = Depends(database.get_db),
     current_user: schemas.UserResponse = Depends(get_current_active_user)
 ):
-    exercise_plans = db.query(models.ExercisePlan).filter(models.ExercisePlan.user_id == current_user.id).all()
-
-    result = []
-    for ep in exercise_plans:
-        ep_dict = ep.__dict__.copy()
-
-        user_data = db.query(models.User).filter(models.User.id == ep.user_id).first()
-        ep_dict['user'] = schemas.UserResponse.from_orm(user_data) if user_data else schemas.UserResponse(id=ep.user_id, name="Unknown User", email="", phone="", role="member", branch=None, gender=None)
-
-        trainer_data = db.query(models.Trainer).filter(models.Trainer.id == ep.assigned_by_trainer_id).first()
-        if trainer_data:
-            trainer_data.specialization = trainer_data.specialization.split(",") if isinstance(trainer_data.specialization, str) and trainer_data.specialization else []
-            ep_dict['assigned_by_trainer'] = schemas.TrainerResponse.from_orm(trainer_data)
-        else:
-            ep_dict['assigned_by_trainer'] = schemas.TrainerResponse(id=ep.assigned_by_trainer_id, name="Unknown Trainer", specialization=[], rating=0.0, experience=0, phone="", email="", availability=None, branch_name=None)
-
-        result.append(schemas.ExercisePlanResponse(**ep_dict))
-    return result
+    """Newest first; follow X-Next-Cursor for older plans."""
+    exercise_plans = plans.plans_page(response, plans.list_plans(
+        db, models.ExercisePlan, models.ExercisePlan.user_id == current_user.id, cursor=cursor, limit=limit
+    ), limit)
+    return [plans.plan_response(ep, schemas.ExercisePlanResponse) for ep in exercise_plans]
 
 
 @router.get("/", response_model=list[schemas.UserResponse])
@@ -498,42 +474,48 @@ def bulk_attendance(
     if not branch:
         raise HTTPException(status_code=400, detail="Trainer's branch not specified.")
 
-    for entry in entries:
-        user = db.query(models.User).filter(
-            models.User.id == entry.user_id,
+    # One IN query for every user in the roster instead of one lookup per entry
+    requested_ids = {entry.user_id for entry in entries}
+    branch_user_ids = set(db.scalars(
+        select(models.User.id).where(
+            models.User.id.in_(requested_ids),
             models.User.branch == branch
-        ).first()
-
-        if not user:
-            continue
-
-        already_marked = db.query(models.UserAttendance).filter(
-            models.UserAttendance.user_id == entry.user_id,
-            models.UserAttendance.date == entry.date,
-            models.UserAttendance.branch == branch
-        ).first()
+        )
+    )) if requested_ids else set()
 
-        if already_marked:
-            already_marked.status = entry.status
-        else:
-            new_record = models.UserAttendance(
-                user_id=entry.user_id,
-                date=entry.date,
-                status=entry.status,
-                branch=branch
-            )
-            db.add(new_record)
+    valid_entries = [entry for entry in entries if entry.user_id in branch_user_ids]
+    skipped = sorted(requested_ids - branch_user_ids)
 
+    existing = attendance.existing_attendance_keys(db, [(e.user_id, e.date) for e in valid_entries])
+    attendance.upsert_attendance(db, [
+        {"user_id": e.user_id, "date": e.date, "status": e.status, "branch": branch}
+        for e in valid_entries
+    ])
     db.commit()
-    return {"message": "Attendance submitted successfully"}
-
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+    updated = sorted({e.user_id for e in valid_entries if (e.user_id, e.date) in existing})
+    inserted = sorted({e.user_id for e in valid_entries if (e.user_id, e.date) not in existing})
+    return {
+        "message": "Attendance submitted successfully",
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": skipped,
+    }
+
+
+@lru_cache(maxsize=None)
+def get_cloudinary_uploader():
+    # Imported and configured on the first upload rather than when the app loads
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+        api_key=os.getenv("CLOUDINARY_API_KEY"),
+        api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+        secure=True
+    )
+    return cloudinary.uploader
 
 @router.post("/upload-profile-picture")
 def upload_profile_picture(
@@ -542,7 +524,7 @@ def upload_profile_picture(
     db: Session = Depends(database.get_db),
     current_user: schemas.UserResponse = Depends(get_current_active_user)
 ):
-    result = cloudinary.uploader.upload(file.file, folder="profile_pictures")
+    result = get_cloudinary_uploader().upload(file.file, folder="profile_pictures")
 
     profile_url = result.get("secure_url")
     if not profile_url:
@@ -0,0 +1,41 @@
+# backend/schema.py
+# Schema changes ship as Alembic migrations (migrations/versions), applied once per
+# deploy with `alembic upgrade head`. Workers only check that the database is current.
+import os
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from . import database
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# strict: refuse to start on an outdated schema, warn: log and carry on, off: skip the check
+DB_SCHEMA_CHECK = os.getenv("DB_SCHEMA_CHECK", "strict").lower()
+
+
+def expected_heads():
+    return set(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+
+
+def current_heads(engine=None):
+    with (engine or database.engine).connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def check_schema_revision(engine=None):
+    """Compares the database's alembic_version with the migration heads; one query at startup."""
+    if DB_SCHEMA_CHECK == "off":
+        return
+    expected, current = expected_heads(), current_heads(engine)
+    if current == expected:
+        return
+    message = (
+        f"Database schema is at {sorted(current) or 'no revision'}, expected {sorted(expected)}. "
+        "Run `alembic upgrade head` before starting the app."
+    )
+    if DB_SCHEMA_CHECK == "warn":
+        print(f"⚠️ {message}")
+        return
+    raise RuntimeError(message)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import date, time, datetime # Import datetime
+from uuid import UUID
 
 class UserCreate(BaseModel):
     name: str
@@ -37,6 +38,9 @@ class TokenData(BaseModel):
     email: Optional[str] = None
     role: Optional[str] = None
     branch: Optional[str] = None
+    id: Optional[int] = None
+    name: Optional[str] = None
+    phone: Optional[str] = None
 
 
 class TrainerCreate(BaseModel):
@@ -269,6 +273,8 @@ class FeeAnalyticsResponse(BaseModel): # ⬅️ NEW: Schema for analytics
     paid_by_cash: float
     paid_by_upi: float
     paid_by_cheque: float   # ✅ Added
+    # Paid amount per payment method, including gateway methods such as Netbanking
+    by_payment_type: Dict[str, float] = {}
 
     class Config:
         from_attributes = True
@@ -277,6 +283,9 @@ class FeeAnalyticsResponse(BaseModel): # ⬅️ NEW: Schema for analytics
 class MonthlyRevenueResponse(BaseModel):
     month: str   # format: YYYY-MM
     total: float
+    # Set only when the rollup is split by branch / payment type
+    branch: Optional[str] = None
+    payment_type: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -301,6 +310,12 @@ class UserNotificationResponse(BaseModel):
 class UserNotificationUpdate(BaseModel):
     is_read: bool
 
+class NotificationsMarkedRead(BaseModel):
+    updated: int
+
+class UnreadNotificationCount(BaseModel):
+    unread_count: int
+
 class UserFeesResponse(BaseModel):
     id: int
     fee_type: str
@@ -405,6 +420,27 @@ class BulkAttendanceEntry(BaseModel):
     date: date
     status: str
 
+# --- Schemas for offline kiosk attendance sync ---
+class KioskAttendanceEventCreate(BaseModel):
+    event_uuid: UUID
+    user_id: int
+    timestamp: datetime
+    kiosk_id: str
+
+class KioskSyncRequest(BaseModel):
+    events: List[KioskAttendanceEventCreate]
+
+class KioskSyncResult(BaseModel):
+    event_uuid: UUID
+    status: str # marked | already_marked | duplicate | rejected
+
+class KioskSyncResponse(BaseModel):
+    marked: int
+    already_marked: int
+    duplicates: int
+    rejected: int
+    results: List[KioskSyncResult]
+
 # ⬅️ Corrected Schemas for PTO Requests
 class PTORequestCreate(BaseModel):
     start_date: date
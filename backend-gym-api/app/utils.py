@@ -1,16 +1,14 @@
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from . import schemas, database, models
+from sqlalchemy import event, inspect
+from collections import namedtuple
+from . import schemas, database, models, metrics, crud, passwords
+from .cache import TTLCache
 from dotenv import load_dotenv
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 load_dotenv()
 
@@ -20,14 +18,14 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Hashing runs on the dedicated executor in passwords.py
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_password(plain_password, hashed_password)
 
 def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    return passwords.hash_password(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -51,7 +49,14 @@ def decode_access_token(token: str):
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return schemas.TokenData(email=email, role=role, branch=branch)
+        return schemas.TokenData(
+            email=email,
+            role=role,
+            branch=branch,
+            id=payload.get("id"),
+            name=payload.get("name"),
+            phone=payload.get("phone"),
+        )
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,67 +64,136 @@ def decode_access_token(token: str):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)
-):
-    token_data = decode_access_token(token)
-    
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
-    if user:
-        if not user.is_verified:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Please verify your email address to access this resource.",
-            )
-        return schemas.UserResponse(
-            id=user.id,
-            name=user.name,
-            email=user.email,
-            phone=user.phone,
-            role=user.role,
-            branch=user.branch
-        )
-    
-    trainer = db.query(models.Trainer).filter(models.Trainer.email == token_data.email).first()
-    if trainer:
-        return schemas.UserResponse(
-            id=trainer.id,
-            name=trainer.name,
-            email=trainer.email,
-            phone=trainer.phone,
-            role="trainer",
-            branch=trainer.branch_name
+def access_token_claims(principal: schemas.UserResponse) -> dict:
+    """Claims embedded at login. Only id, role and branch are trusted by get_current_user."""
+    return {
+        "sub": principal.email,
+        "role": principal.role,
+        "branch": principal.branch,
+        "id": principal.id,
+        "name": principal.name,
+        "phone": principal.phone,
+    }
+
+# --- Principal status cache ---
+# Tokens are trusted for identity, but whether the account still exists, is verified
+# and has the same role/branch is re-checked against the DB at most once per TTL, and
+# name and phone are served from that DB read rather than from the token claims.
+# Entries are dropped whenever a User or Trainer row is written in this process. The
+# cache is per worker process: other gunicorn workers can keep serving the previous
+# status, name and phone for up to PRINCIPAL_STATUS_TTL_SECONDS after a change.
+PRINCIPAL_STATUS_TTL_SECONDS = float(os.getenv("PRINCIPAL_STATUS_TTL_SECONDS", 30))
+
+PrincipalStatus = namedtuple("PrincipalStatus", ["id", "role", "branch", "is_verified", "name", "phone"])
+_PRINCIPAL_NOT_FOUND = PrincipalStatus(None, None, None, False, None, None)
+_principal_status = TTLCache(PRINCIPAL_STATUS_TTL_SECONDS, maxsize=10000)
+
+def _forget_principal(mapper, connection, target):
+    _principal_status.pop(target.email)
+    # An email change must also drop the entry cached under the old address
+    for old_email in inspect(target).attrs.email.history.deleted or ():
+        _principal_status.pop(old_email)
+
+for _model in (models.User, models.Trainer):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _forget_principal)
+
+def _identity_response(identity) -> schemas.UserResponse:
+    """Builds the current user from a crud.identity_lookup row and caches its status."""
+    _principal_status.set(
+        identity.email,
+        PrincipalStatus(
+            identity.id, identity.role, identity.branch, bool(identity.is_verified), identity.name, identity.phone
+        ),
+    )
+    if not identity.is_verified:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Please verify your email address to access this resource.",
         )
-    
-    raise HTTPException(
+    return schemas.UserResponse(
+        id=identity.id,
+        name=identity.name,
+        email=identity.email,
+        phone=identity.phone,
+        role=identity.role,
+        branch=identity.branch
+    )
+
+def _principal_not_found() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not find user or trainer for authenticated token",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-def send_email(to_email: str, subject: str, html_content: str):
-    email_host = os.getenv("EMAIL_HOST")
-    email_port = int(os.getenv("EMAIL_PORT", 587))
-    email_user = os.getenv("EMAIL_USER")
-    email_pass = os.getenv("EMAIL_PASS")
-    email_from_name = os.getenv("EMAIL_FROM_NAME")
+def _response_from_claims(token_data: schemas.TokenData) -> Optional[schemas.UserResponse]:
+    """
+    Fast path: builds the current user from the cached status when it still agrees
+    with the token's id, role and branch. Returns None when the DB must be consulted.
+    """
+    if token_data.id is None:
+        return None  # token issued before claims carried the user id
 
-    if not all([email_host, email_port, email_user, email_pass, email_from_name]):
-        print("Email configuration is missing. Skipping email sending.")
-        return
+    cached = _principal_status.get(token_data.email)
+    if cached is None:
+        return None
+    if cached is _PRINCIPAL_NOT_FOUND:
+        raise _principal_not_found()
+    if (cached.id, cached.role, cached.branch) != (token_data.id, token_data.role, token_data.branch):
+        return None  # role or branch changed since the token was issued
+    if not cached.is_verified:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Please verify your email address to access this resource.",
+        )
 
-    message = MIMEMultipart("alternative")
-    message["Subject"] = subject
-    message["From"] = f"{email_from_name} <{email_user}>"
-    message["To"] = to_email
+    metrics.inc("auth.claims_fast_path")
+    return schemas.UserResponse(
+        id=cached.id,
+        name=cached.name,
+        email=token_data.email,
+        phone=cached.phone,
+        role=cached.role,
+        branch=cached.branch
+    )
 
-    message.attach(MIMEText(html_content, "html"))
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    token_data = decode_access_token(token)
 
+    current_user = _response_from_claims(token_data)
+    if current_user:
+        return current_user
+
+    metrics.inc("auth.db_lookup")
+    db = database.SessionLocal()
     try:
-        with smtplib.SMTP(email_host, email_port) as server:
-            server.starttls()
-            server.login(email_user, email_pass)
-            server.sendmail(email_user, to_email, message.as_string())
-        print(f"Email sent successfully to {to_email}")
-    except Exception as e:
-        print(f"Error sending email to {to_email}: {e}")
\ No newline at end of file
+        database.checkout_connection(db)
+        identity = db.execute(crud.identity_lookup(token_data.email)).first()
+    finally:
+        db.close()
+
+    if identity:
+        return _identity_response(identity)
+
+    _principal_status.set(token_data.email, _PRINCIPAL_NOT_FOUND)
+    raise _principal_not_found()
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme)):
+    """Same as get_current_user, for async endpoints running on the AsyncSession."""
+    token_data = decode_access_token(token)
+
+    current_user = _response_from_claims(token_data)
+    if current_user:
+        return current_user
+
+    metrics.inc("auth.db_lookup")
+    async with database.get_async_session_factory()() as db:
+        await database.checkout_async_connection(db)
+        identity = (await db.execute(crud.identity_lookup(token_data.email))).first()
+
+    if identity:
+        return _identity_response(identity)
+
+    _principal_status.set(token_data.email, _PRINCIPAL_NOT_FOUND)
+    raise _principal_not_found()
@@ -0,0 +1,30 @@
+# backend/gunicorn.conf.py
+# Picked up automatically by `gunicorn app.main:app` run from this directory.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 300))
+
+# Import the app, and the face models with it, once in the master so forked workers
+# share those pages copy-on-write instead of each loading its own copy. Off by default:
+# with preloading, code changes need a full restart rather than a HUP.
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+
+
+def when_ready(server):
+    # Runs in the master before the first fork
+    if preload_app:
+        from app import face_engine
+
+        face_engine.preload()
+        server.log.info("Face recognition models preloaded in the master")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import database
+
+        # Connections opened in the master must not be shared with the children
+        database.engine.dispose(close=False)
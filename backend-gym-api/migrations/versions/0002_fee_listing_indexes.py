@@ -0,0 +1,35 @@
+"""fee listing indexes
+
+Keyset pages of /fees/all, /fees/branch and /fees/my-fees on (due_date, id).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 08:10:55.398194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('fee_assignments', schema=None) as batch_op:
+        batch_op.create_index('ix_fee_assignments_branch_due_date_id', ['branch_name', 'due_date', 'id'], unique=False)
+        batch_op.create_index('ix_fee_assignments_due_date_id', ['due_date', 'id'], unique=False)
+        batch_op.create_index('ix_fee_assignments_user_due_date_id', ['user_id', 'due_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('fee_assignments', schema=None) as batch_op:
+        batch_op.drop_index('ix_fee_assignments_user_due_date_id')
+        batch_op.drop_index('ix_fee_assignments_due_date_id')
+        batch_op.drop_index('ix_fee_assignments_branch_due_date_id')
@@ -0,0 +1,31 @@
+"""fee receipt payment_date index
+
+Monthly revenue rollups filter and group fee_receipts on payment_date.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:42:13.517930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('fee_receipts', schema=None) as batch_op:
+        batch_op.create_index('ix_fee_receipts_payment_date', ['payment_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('fee_receipts', schema=None) as batch_op:
+        batch_op.drop_index('ix_fee_receipts_payment_date')
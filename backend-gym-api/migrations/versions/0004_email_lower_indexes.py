@@ -0,0 +1,32 @@
+"""email lower indexes
+
+Login and token lookups match users and trainers on lower(email).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:31:06.204715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=False)
+    op.create_index('ix_trainers_email_lower', 'trainers', [sa.text('lower(email)')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trainers_email_lower', table_name='trainers')
+    op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,84 @@
+# backend/tests/test_email_outbox.py
+# Delivers outbox messages to a local aiosmtpd server. Run from backend-gym-api:
+#     python -m pytest tests
+import os
+import socket
+import tempfile
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/outbox.db"
+os.environ["EMAIL_HOST"] = "127.0.0.1"
+os.environ["EMAIL_USER"] = "noreply@smartflex.test"
+os.environ["EMAIL_FROM_NAME"] = "Smartflex"
+os.environ["EMAIL_USE_TLS"] = "false"
+os.environ.pop("EMAIL_PASS", None)
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app import database, email_outbox, models
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def db():
+    models.Base.metadata.create_all(database.engine)
+    session = database.SessionLocal()
+    yield session
+    session.close()
+    models.Base.metadata.drop_all(database.engine)
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    os.environ["EMAIL_PORT"] = str(controller.port)
+    yield handler
+    controller.stop()
+
+
+def test_process_batch_delivers_and_marks_sent(db, smtp_server):
+    message = email_outbox.enqueue_email(db, "member@smartflex.test", "Fee receipt", "<p>Paid</p>")
+    db.commit()
+
+    sender = email_outbox.OutboxSender()
+    try:
+        assert sender.process_batch() == 1
+    finally:
+        sender.smtp.close()
+
+    assert [envelope.rcpt_tos for envelope in smtp_server.envelopes] == [["member@smartflex.test"]]
+    assert b"Subject: Fee receipt" in smtp_server.envelopes[0].content
+
+    db.refresh(message)
+    assert message.status == "sent"
+    assert message.attempts == 1
+    assert message.sent_at is not None
+
+
+def test_unreachable_server_keeps_attempts(db):
+    os.environ["EMAIL_PORT"] = str(_free_port())  # nothing listens here
+    message = email_outbox.enqueue_email(db, "member@smartflex.test", "Fee receipt", "<p>Paid</p>")
+    db.commit()
+
+    assert email_outbox.OutboxSender().process_batch() == 0
+
+    db.refresh(message)
+    assert message.status == "pending"
+    assert message.attempts == 0
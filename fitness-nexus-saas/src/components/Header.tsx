@@ -1,7 +1,7 @@
 import { Bell, Menu, LogOut } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { useNavigate } from "react-router-dom";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import axios from "axios";
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogFooter } from "@/components/ui/dialog";
 
@@ -24,23 +24,80 @@ export function Header({ sidebarCollapsed = false, onMenuClick }: HeaderProps) {
   const [showDropdown, setShowDropdown] = useState(false);
   const [logoutModalOpen, setLogoutModalOpen] = useState(false); // new state for logout modal
 
+  const [unreadCount, setUnreadCount] = useState(0);
+  // Newest notification seen so far; passed as `since` to fetch only newer ones
+  const latestCursorRef = useRef<string | null>(null);
+
   const fetchNotifications = async () => {
     const token = localStorage.getItem("token");
     try {
       const res = await axios.get(`${import.meta.env.VITE_API_URL}/fees/notifications`, {
         headers: { Authorization: `Bearer ${token}` },
+        params: { limit: 20 },
       });
       setNotifications(res.data);
+      latestCursorRef.current = res.headers["x-latest-cursor"] ?? null;
+    } catch (err) {
+      console.error("Notification fetch failed");
+    }
+  };
+
+  const fetchNewNotifications = async () => {
+    if (!latestCursorRef.current) {
+      return fetchNotifications();
+    }
+    const token = localStorage.getItem("token");
+    const limit = 20;
+    try {
+      // Pages walk forward from the cursor; a full page means more may follow
+      let received: Notification[];
+      do {
+        const res = await axios.get(`${import.meta.env.VITE_API_URL}/fees/notifications`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { since: latestCursorRef.current, limit },
+        });
+        received = res.data;
+        if (received.length > 0) {
+          setNotifications(prev => [...received, ...prev]);
+        }
+        latestCursorRef.current = res.headers["x-latest-cursor"] ?? latestCursorRef.current;
+      } while (received.length === limit);
     } catch (err) {
       console.error("Notification fetch failed");
     }
   };
 
+  const fetchUnreadCount = async () => {
+    const token = localStorage.getItem("token");
+    try {
+      const res = await axios.get(`${import.meta.env.VITE_API_URL}/fees/notifications/unread-count`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      return {
+        count: res.data.unread_count as number,
+        latestCursor: (res.headers["x-latest-cursor"] ?? null) as string | null,
+      };
+    } catch (err) {
+      console.error("Unread count fetch failed");
+      return null;
+    }
+  };
+
   useEffect(() => {
     fetchNotifications();
-  }, []);
+    fetchUnreadCount().then(unread => unread !== null && setUnreadCount(unread.count));
 
-  const unreadCount = notifications.filter(n => !n.is_read).length;
+    // Poll the cheap unread count; fetch newer notifications only when the newest one changed
+    const interval = setInterval(async () => {
+      const unread = await fetchUnreadCount();
+      if (unread === null) return;
+      setUnreadCount(unread.count);
+      if (unread.latestCursor && unread.latestCursor !== latestCursorRef.current) {
+        fetchNewNotifications();
+      }
+    }, 60000);
+    return () => clearInterval(interval);
+  }, []);
 
   const handleLogout = () => {
     localStorage.clear();
@@ -51,10 +108,11 @@ export function Header({ sidebarCollapsed = false, onMenuClick }: HeaderProps) {
     const token = localStorage.getItem("token");
     if (!showDropdown && unreadCount > 0) {
       try {
-        const res = await axios.put(`${import.meta.env.VITE_API_URL}/fees/notifications/mark-all-read`, {}, {
+        await axios.put(`${import.meta.env.VITE_API_URL}/fees/notifications/mark-all-read`, {}, {
           headers: { Authorization: `Bearer ${token}` },
         });
-        setNotifications(res.data);
+        setNotifications(prev => prev.map(n => ({ ...n, is_read: true })));
+        setUnreadCount(0);
       } catch (err) {
         console.error("Failed to mark notifications as read", err);
       }
@@ -70,6 +128,9 @@ export function Header({ sidebarCollapsed = false, onMenuClick }: HeaderProps) {
       });
 
       setNotifications(prev => prev.map(n => n.id === notification.id ? { ...n, is_read: true } : n));
+      if (!notification.is_read) {
+        setUnreadCount(prev => Math.max(0, prev - 1));
+      }
 
       switch (notification.notification_type) {
         case "fee_assignment":
@@ -1,6 +1,26 @@
 import { clsx, type ClassValue } from "clsx"
 import { twMerge } from "tailwind-merge"
+import axios, { type AxiosRequestConfig } from "axios"
 
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+// Follows the X-Next-Cursor header of a paginated list endpoint and returns every page.
+export async function fetchAllPages<T>(
+  url: string,
+  config: AxiosRequestConfig = {},
+  limit = 500
+): Promise<T[]> {
+  const items: T[] = []
+  let cursor: string | undefined
+  do {
+    const res = await axios.get<T[]>(url, {
+      ...config,
+      params: { ...config.params, limit, ...(cursor ? { cursor } : {}) },
+    })
+    items.push(...res.data)
+    cursor = res.headers["x-next-cursor"] ?? undefined
+  } while (cursor)
+  return items
+}
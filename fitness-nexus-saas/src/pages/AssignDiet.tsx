@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { fetchAllPages } from "@/lib/utils";
 import { useNavigate } from "react-router-dom";
 
 interface User {
@@ -55,10 +56,10 @@ export default function AssignDiet() {
   const fetchAssignedDietPlans = async () => {
     try {
       setLoadingPlans(true);
-      const res = await axios.get(`${import.meta.env.VITE_API_URL}/trainers/diet-plans`, {
+      const plans = await fetchAllPages<DietPlan>(`${import.meta.env.VITE_API_URL}/trainers/diet-plans`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setAssignedDietPlans(res.data);
+      setAssignedDietPlans(plans);
     } catch (err: any) {
       console.error("Failed to fetch assigned diet plans:", err);
       setError(`Failed to load assigned plans: ${err.response?.data?.detail || err.message}`);
@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { fetchAllPages } from "@/lib/utils";
 import { useNavigate } from "react-router-dom";
 
 interface User {
@@ -55,10 +56,10 @@ export default function AssignExercise() {
   const fetchAssignedExercisePlans = async () => {
     try {
       setLoadingPlans(true);
-      const res = await axios.get(`${import.meta.env.VITE_API_URL}/trainers/exercise-plans`, {
+      const plans = await fetchAllPages<ExercisePlan>(`${import.meta.env.VITE_API_URL}/trainers/exercise-plans`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setAssignedExercisePlans(res.data);
+      setAssignedExercisePlans(plans);
     } catch (err: any) {
       console.error("Failed to fetch assigned exercise plans:", err);
       setError(`Failed to load assigned plans: ${err.response?.data?.detail || err.message}`);
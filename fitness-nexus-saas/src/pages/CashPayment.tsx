@@ -1,6 +1,7 @@
 // src/pages/CashPayment.tsx
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { fetchAllPages } from "@/lib/utils";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import jsPDF from "jspdf";
@@ -50,11 +51,11 @@ export default function CashPayment() {
     setError(null);
     try {
       if (!token) throw new Error("No authentication token found. Please log in.");
-      const res = await axios.get(`${import.meta.env.VITE_API_URL}/fees/all`, {
+      const fees = await fetchAllPages<Fee>(`${import.meta.env.VITE_API_URL}/fees/all`, {
         headers: { Authorization: `Bearer ${token}` },
+        params: { is_paid: false },
       });
-      // Filter for unpaid fees only
-      setUnpaidFees(res.data.filter((fee: Fee) => !fee.is_paid));
+      setUnpaidFees(fees);
     } catch (err: any) {
       const errorMessage = `Failed to load unpaid fees: ${err.response?.data?.detail || err.message}`;
       console.error(errorMessage, err);
@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { fetchAllPages } from "@/lib/utils";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
@@ -93,10 +94,10 @@ export default function Fees() {
       if (!token) {
         throw new Error("No authentication token found. Please log in.");
       }
-      const res = await axios.get(`${import.meta.env.VITE_API_URL}/fees/my-fees`, {
+      const fees = await fetchAllPages<Fee>(`${import.meta.env.VITE_API_URL}/fees/my-fees`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setFees(res.data);
+      setFees(fees);
     } catch (err: any) {
       console.error("Failed to load fees:", err);
       setError(`Failed to load fees: ${err.response?.data?.detail || err.message}`);
@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { fetchAllPages } from "@/lib/utils";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
@@ -92,11 +93,11 @@ export default function ManageFees() {
 
   const fetchBranchFees = async () => {
     try {
-      const res = await axios.get(`${import.meta.env.VITE_API_URL}/fees/branch`, {
+      const fees = await fetchAllPages<Fee>(`${import.meta.env.VITE_API_URL}/fees/branch`, {
         headers: { Authorization: `Bearer ${token}` },
       });
 
-      const filtered = res.data.filter((fee: Fee) => {
+      const filtered = fees.filter((fee) => {
         if (!searchQuery) return true;
         const search = searchQuery.toLowerCase();
         return (
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import axios from "axios";
+import { fetchAllPages } from "@/lib/utils";
 
 interface DietPlan {
   id: number;
@@ -23,10 +23,10 @@ export default function MyDiet() {
   useEffect(() => {
     const fetchMyDietPlans = async () => {
       try {
-        const res = await axios.get(`${import.meta.env.VITE_API_URL}/users/my-diet-plans`, {
+        const plans = await fetchAllPages<DietPlan>(`${import.meta.env.VITE_API_URL}/users/my-diet-plans`, {
           headers: { Authorization: `Bearer ${token}` },
         });
-        setDietPlans(res.data);
+        setDietPlans(plans);
       } catch (err: any) {
         console.error("Failed to fetch diet plans:", err);
         setError(`Failed to load diet plans: ${err.response?.data?.detail || err.message}`);
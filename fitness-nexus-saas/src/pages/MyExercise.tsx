@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import axios from "axios";
+import { fetchAllPages } from "@/lib/utils";
 
 interface ExercisePlan {
   id: number;
@@ -23,10 +23,10 @@ export default function MyExercise() {
   useEffect(() => {
     const fetchMyExercisePlans = async () => {
       try {
-        const res = await axios.get(`${import.meta.env.VITE_API_URL}/users/my-exercise-plans`, {
+        const plans = await fetchAllPages<ExercisePlan>(`${import.meta.env.VITE_API_URL}/users/my-exercise-plans`, {
           headers: { Authorization: `Bearer ${token}` },
         });
-        setExercisePlans(res.data);
+        setExercisePlans(plans);
       } catch (err: any) {
         console.error("Failed to fetch exercise plans:", err);
         setError(`Failed to load exercise plans: ${err.response?.data?.detail || err.message}`);
@@ -34,7 +34,7 @@ import { saveAs } from 'file-saver';
 import { Popover, PopoverContent, PopoverTrigger } from "@/components/ui/popover";
 import { format } from "date-fns";
 import { Calendar as CalendarIcon } from "lucide-react";
-import { cn } from "@/lib/utils";
+import { cn, fetchAllPages } from "@/lib/utils";
 import { Calendar } from "@/components/ui/calendar";
 
 interface Fee {
@@ -58,6 +58,7 @@ interface FeeAnalytics {
   paid_by_cash: number;
   paid_by_upi: number;
   paid_by_cheque: number; // ✅ added
+  by_payment_type?: Record<string, number>;
 }
 
 interface MonthlyRevenueItem {
@@ -123,10 +124,10 @@ export default function SuperadminBilling() {
     setError(null);
     try {
       if (!token) throw new Error("No authentication token found. Please log in.");
-      const res = await axios.get(`${import.meta.env.VITE_API_URL}/fees/all`, {
+      const fees = await fetchAllPages<Fee>(`${import.meta.env.VITE_API_URL}/fees/all`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setFees(res.data);
+      setFees(fees);
     } catch (err: any) {
       console.error("Failed to load fees:", err);
       setError(`Failed to load fees: ${err.response?.data?.detail || err.message}`);
@@ -548,10 +549,16 @@ export default function SuperadminBilling() {
               <Banknote className="w-4 h-4 text-blue-500" />
             </CardTitle>
             <CardContent className="text-sm mt-2 space-y-1">
-              <p>Card: <span className="font-bold">₹{analytics.paid_by_card.toFixed(2)}</span></p>
-              <p>Cash: <span className="font-bold">₹{analytics.paid_by_cash.toFixed(2)}</span></p>
-              <p>UPI: <span className="font-bold">₹{analytics.paid_by_upi.toFixed(2)}</span></p>
-              <p>Cheque: <span className="font-bold">₹{analytics.paid_by_cheque.toFixed(2)}</span></p>
+              {Object.entries(
+                analytics.by_payment_type ?? {
+                  Card: analytics.paid_by_card,
+                  Cash: analytics.paid_by_cash,
+                  UPI: analytics.paid_by_upi,
+                  Cheque: analytics.paid_by_cheque,
+                }
+              ).map(([method, amount]) => (
+                <p key={method}>{method}: <span className="font-bold">₹{amount.toFixed(2)}</span></p>
+              ))}
             </CardContent>
           </Card>
         </div>